@@ -0,0 +1,207 @@
+import logging
+import threading
+import time
+from monitoring import metrics
+
+try:
+    import sounddevice as sd
+except OSError:
+    # PortAudio 라이브러리가 없는 환경 (빌드 서버 등): 녹음/합성 소스만 사용 가능
+    sd = None
+
+logger = logging.getLogger(__name__)
+
+STREAM_OPENS = metrics.registry.counter("audio_stream_opens_total", "Shared input streams opened on an audio device")
+DEVICE_REFRESHES = metrics.registry.counter(
+    "audio_device_refreshes_total", "PortAudio re-initializations after hot-plug or stream errors")
+
+class SharedInputStream:
+    """ 같은 (장치, 샘플레이트, 채널 수, 블록 크기, 샘플 형식)을 쓰는 구독자들이 함께 쓰는 입력 스트림
+
+    PortAudio 콜백에서 구독자 콜백 callback(indata, status)을 차례로 호출한다 (구독자는 복사만 하고 바로 반환).
+    마지막 구독자가 빠져도 IDLE_CLOSE_SECONDS 동안은 열어 두어, 웹소켓 재접속 때 장치 설정 비용이 들지 않게 한다.
+    """
+
+    IDLE_CLOSE_SECONDS = 30.0
+
+    def __init__(self, manager, device_name, samplerate, channels, blocksize, dtype):
+        self.manager = manager
+        self.device_name = device_name  # None이면 기본 입력 장치 (인덱스는 핫플러그 때 바뀔 수 있어 이름으로 보관)
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.dtype = dtype
+        self.subscribers = ()  # 콜백 스레드가 락 없이 읽도록 교체만 하는 튜플
+        self.stream = None
+        self.close_timer = None
+
+    def subscribe(self, callback):
+        """ 구독 시작 (스트림이 닫혀 있으면 연다. 장치를 열 수 없으면 예외) """
+        with self.manager.lock:
+            self.cancel_close_timer()
+            if self.stream is None:
+                self.open()
+            self.subscribers = self.subscribers + (callback,)
+
+    def unsubscribe(self, callback):
+        with self.manager.lock:
+            self.subscribers = tuple(subscriber for subscriber in self.subscribers if subscriber is not callback)
+            if not self.subscribers and self.stream is not None and self.close_timer is None:
+                self.close_timer = threading.Timer(self.IDLE_CLOSE_SECONDS, self.close_if_idle)
+                self.close_timer.daemon = True
+                self.close_timer.start()
+
+    def cancel_close_timer(self):
+        if self.close_timer is not None:
+            self.close_timer.cancel()
+            self.close_timer = None
+
+    def close_if_idle(self):
+        with self.manager.lock:
+            self.close_timer = None
+            if not self.subscribers:
+                self.close()
+
+    def open(self):
+        device = self.manager.device_index(self.device_name) if self.device_name else None
+        stream = sd.InputStream(
+            device=device,
+            samplerate=self.samplerate,
+            channels=self.channels,
+            blocksize=self.blocksize,
+            dtype=self.dtype,
+            callback=self.callback,
+            finished_callback=self.finished,
+        )
+        stream.start()
+        self.stream = stream
+        STREAM_OPENS.inc()
+
+    def close(self):
+        # finished 콜백이 의도한 종료로 보도록 먼저 비움
+        stream, self.stream = self.stream, None
+        self.cancel_close_timer()
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception as e:
+                logger.warning("Closing input stream failed: %s", e)
+
+    def callback(self, indata, frames, time_info, status):
+        for subscriber in self.subscribers:
+            try:
+                subscriber(indata, status)
+            except Exception:
+                logger.exception("Audio subscriber failed")
+
+    def finished(self):
+        # close() 없이 끝났으면 장치 분리/오류 → 관리자에게 복구 요청
+        if self.stream is not None:
+            logger.warning("Input stream on %s stopped unexpectedly", self.device_name or "default device")
+            self.manager.recover()
+
+class AudioDeviceManager:
+    """ 프로세스 전체에서 하나만 쓰는 오디오 장치 관리자
+
+    PortAudio는 import 시 한 번만 초기화되고, 장치 목록은 캐시해 두었다가 스트림 오류나 refresh() 호출 때만
+    PortAudio를 다시 초기화해 새로 읽는다 (없는 장치를 찾았다는 이유로는 다시 읽지 않음: 재초기화하면 열린 스트림이
+    모두 닫혔다 다시 열린다). 입력 스트림은 설정별로 공유한다.
+    """
+
+    REFRESH_INTERVAL = 2.0  # 스트림 오류 복구 때 재초기화 최소 간격 (초)
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.device_cache = None
+        self.streams = {}  # (장치 이름, 샘플레이트, 채널 수, 블록 크기, 형식) -> SharedInputStream
+        self.last_refresh = 0.0
+        self.recovery_timer = None  # 예약된 복구 재초기화 (PortAudio 콜백에서 잡으므로 별도 락)
+        self.recovery_lock = threading.Lock()
+
+    def devices(self):
+        """ 캐시된 장치 목록 (sounddevice.query_devices()의 dict 목록) """
+        if sd is None:
+            return []
+        with self.lock:
+            if self.device_cache is None:
+                self.device_cache = [dict(device) for device in sd.query_devices()]
+            return self.device_cache
+
+    def lookup(self, pattern):
+        for device in self.devices():
+            if pattern in device["name"] and device["max_input_channels"] > 0:
+                return device
+        return None
+
+    def find_input(self, pattern):
+        """ 이름에 pattern이 들어간 입력 장치의 전체 이름 (캐시된 목록에 없으면 None) """
+        device = self.lookup(pattern)
+        return device["name"] if device else None
+
+    def device_index(self, name):
+        device = self.lookup(name)
+        if device is None:
+            raise ValueError(f"입력 장치를 찾을 수 없음: {name}")
+        return device["index"]
+
+    def max_input_channels(self, name):
+        """ 장치의 최대 입력 채널 수 (기본 장치는 모노) """
+        device = self.lookup(name) if name else None
+        return max(int(device["max_input_channels"]), 1) if device else 1
+
+    def open_input(self, device_name=None, samplerate=48000, channels=None, blocksize=1024, dtype="float32"):
+        """ 설정이 같은 공유 입력 스트림 (channels가 None이면 장치의 입력 채널 전부). subscribe() 때 실제로 열린다. """
+        if sd is None:
+            raise RuntimeError("PortAudio를 찾을 수 없어 오디오 장치를 열 수 없습니다. (녹음/합성 소스는 사용 가능)")
+        with self.lock:
+            if channels is None:
+                channels = self.max_input_channels(device_name)
+            key = (device_name, samplerate, channels, blocksize, dtype)
+            stream = self.streams.get(key)
+            if stream is None:
+                stream = self.streams[key] = SharedInputStream(self, *key)
+            return stream
+
+    def refresh(self, min_interval=0.0):
+        """ PortAudio를 다시 초기화해 장치 목록을 새로 읽음 (열린 스트림은 닫고, 구독자가 있으면 다시 연다) """
+        if sd is None:
+            return False
+        with self.lock:
+            if time.monotonic() - self.last_refresh < min_interval:
+                return False
+            self.last_refresh = time.monotonic()
+
+            active = [stream for stream in self.streams.values() if stream.stream is not None]
+            for stream in active:
+                stream.close()
+            sd._terminate()
+            sd._initialize()
+            self.device_cache = None
+            DEVICE_REFRESHES.inc()
+
+            for stream in active:
+                if not stream.subscribers:
+                    continue
+                try:
+                    stream.open()
+                except Exception as e:
+                    logger.warning("Reopening input stream on %s failed: %s", stream.device_name or "default device", e)
+            return True
+
+    def recover(self):
+        """ 스트림 오류 후 재초기화 예약 (최근에 재초기화했으면 간격이 끝나는 때로 미룸, 이미 예약돼 있으면 그대로) """
+        # PortAudio 콜백 스레드에서 호출되므로 재초기화는 타이머 스레드에서
+        with self.recovery_lock:
+            if self.recovery_timer is not None:
+                return
+            delay = max(0.0, self.last_refresh + self.REFRESH_INTERVAL - time.monotonic())
+            self.recovery_timer = threading.Timer(delay, self.run_recovery)
+            self.recovery_timer.daemon = True
+            self.recovery_timer.start()
+
+    def run_recovery(self):
+        with self.recovery_lock:
+            self.recovery_timer = None
+        self.refresh()
+
+device_manager = AudioDeviceManager()
@@ -0,0 +1,6 @@
+import inspect
+import numpy as np
+
+# numpy 2.0부터 rfft에 out 인자를 넘겨 미리 잡아둔 버퍼에 결과를 받을 수 있음
+# (코드 감지기와 튜너가 함께 쓰며, 어느 한쪽 DSP 모듈을 불러오지 않고 확인할 수 있게 따로 둠)
+RFFT_SUPPORTS_OUT = 'out' in inspect.signature(np.fft.rfft).parameters
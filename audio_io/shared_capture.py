@@ -0,0 +1,134 @@
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+# 헤더 (int64): 누적 기록 프레임 수, 입력 오버플로 횟수, 용량(프레임), 블록 크기, 채널 수, 샘플레이트
+HEADER_FIELDS = 6
+WRITTEN, OVERFLOWS, CAPACITY, BLOCKSIZE, CHANNELS, SAMPLERATE = range(HEADER_FIELDS)
+HEADER_BYTES = HEADER_FIELDS * 8
+
+class SharedRing:
+    """ multiprocessing.shared_memory 위의 단일 생산자 / 다중 소비자 오디오 링 버퍼
+
+    캡처 프로세스가 블록을 써 넣은 뒤 누적 프레임 수를 올리고, DSP 프로세스는 이름으로 붙어서
+    자기 읽기 위치부터 블록을 복사 없이 (블록 크기 × 채널) 뷰로 읽는다.
+    용량은 블록 크기의 배수라 블록이 링 끝에서 잘리지 않는다.
+    """
+
+    def __init__(self, memory, owner):
+        self.memory = memory
+        self.owner = owner
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=memory.buf)
+        capacity, channels = int(self.header[CAPACITY]), int(self.header[CHANNELS])
+        self.data = np.ndarray((capacity, channels), dtype=np.float32, buffer=memory.buf, offset=HEADER_BYTES)
+
+    @classmethod
+    def create(cls, samplerate, channels, blocksize, capacity_blocks=64):
+        capacity = blocksize * capacity_blocks
+        memory = shared_memory.SharedMemory(create=True, size=HEADER_BYTES + capacity * channels * 4)
+        header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=memory.buf)
+        header[:] = 0
+        header[CAPACITY], header[BLOCKSIZE], header[CHANNELS], header[SAMPLERATE] = capacity, blocksize, channels, samplerate
+        del header
+        return cls(memory, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    @property
+    def capacity(self):
+        return len(self.data)
+
+    @property
+    def blocksize(self):
+        return int(self.header[BLOCKSIZE])
+
+    @property
+    def channels(self):
+        return int(self.header[CHANNELS])
+
+    @property
+    def samplerate(self):
+        return int(self.header[SAMPLERATE])
+
+    @property
+    def written(self):
+        return int(self.header[WRITTEN])
+
+    @property
+    def overflows(self):
+        return int(self.header[OVERFLOWS])
+
+    def write(self, block, overflow=False):
+        """ 캡처 프로세스에서만 호출: 데이터를 먼저 쓰고 누적 프레임 수를 올림 """
+        written = int(self.header[WRITTEN])
+        start = written % self.capacity
+        self.data[start:start + len(block)] = block
+        if overflow:
+            self.header[OVERFLOWS] += 1
+        self.header[WRITTEN] = written + len(block)
+
+    def close(self):
+        # 뷰를 먼저 놓아야 공유 메모리를 닫을 수 있음
+        self.header = self.data = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+class RingReader:
+    """ SharedRing의 소비자 쪽 읽기 위치
+
+    처리가 밀려 생산자가 아직 읽지 않은 블록을 덮어쓸 만큼 뒤처지면 가장 최근 블록으로 건너뛰고 dropped에 센다.
+    """
+
+    def __init__(self, ring, poll_interval=None):
+        self.ring = ring
+        self.position = ring.written  # 붙은 시점 이후 블록부터 읽음
+        self.dropped = 0
+        self.poll_interval = poll_interval or ring.blocksize / ring.samplerate / 4
+
+    def read(self, timeout=None):
+        """ 다음 블록 뷰 (timeout 동안 새 블록이 없으면 None). 뷰는 다음 read() 전까지만 유효하다. """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        blocksize = self.ring.blocksize
+        while self.ring.written - self.position < blocksize:
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+        written = self.ring.written
+        if written - self.position > self.ring.capacity - blocksize:
+            # 쓰는 중인 블록과 겹치지 않도록 가장 최근에 완성된 블록으로 이동
+            latest = written - blocksize
+            self.dropped += (latest - self.position) // blocksize
+            self.position = latest
+        start = self.position % self.ring.capacity
+        self.position += blocksize
+        return self.ring.data[start:start + blocksize]
+
+def capture_main(ring_name, source_spec, device_name, stop_event):
+    """ 캡처 프로세스 진입점: 오디오 소스의 블록을 공유 링에 쓰기만 한다 (웹 서버의 GIL과 분리) """
+    # 자식 프로세스에서 PortAudio를 따로 초기화하도록 여기서 import
+    from audio_io.sources import open_source
+
+    ring = SharedRing.attach(ring_name)
+    source = open_source(source_spec, ring.samplerate, ring.blocksize, ring.channels, device_name=device_name)
+
+    channels = ring.channels
+
+    def on_audio(indata, status):
+        ring.write(indata[:, :channels], status.input_overflow)
+
+    source.subscribe(on_audio)
+    try:
+        stop_event.wait()
+    finally:
+        source.unsubscribe(on_audio)
+        # 진행 중이던 콜백이 끝날 시간을 준 뒤 링을 닫음
+        time.sleep(ring.blocksize / ring.samplerate * 2)
+        ring.close()
@@ -0,0 +1,190 @@
+import os
+import threading
+import time
+import wave
+import numpy as np
+from audio_io.device_manager import device_manager
+
+class BlockStatus:
+    """ 녹음/합성 소스가 콜백에 넘기는 상태 (sounddevice.CallbackFlags와 같은 속성) """
+    input_overflow = False
+
+class BufferedSource:
+    """ 메모리의 샘플 배열을 블록 단위로 내보내는 오디오 소스 (파일/합성 공통)
+
+    장치 관리자의 공유 입력 스트림과 같은 subscribe(callback)/unsubscribe(callback) 인터페이스로
+    실제 시간 속도에 맞춰 callback(indata, status)을 호출하고 (indata는 (프레임 × 채널) float32, -1~1),
+    blocks()로는 같은 블록을 기다림 없이 꺼낼 수 있어 최대 속도 재생에 쓴다.
+    """
+
+    def __init__(self, samples, samplerate, blocksize=1024, loop=False):
+        samples = np.asarray(samples, dtype=np.float32)
+        samples = samples.reshape(-1, 1) if samples.ndim == 1 else samples
+        if not len(samples):
+            raise ValueError("오디오 소스에 샘플이 없습니다.")
+        if len(samples) < blocksize:
+            # 블록 하나가 안 되면 blocks()가 비어 반복 재생이 쉬지 않고 돌므로 무음으로 한 블록을 채움
+            samples = np.concatenate([samples, np.zeros((blocksize - len(samples), samples.shape[1]), np.float32)])
+        self.samples = samples
+        self.samplerate = samplerate
+        self.channels = self.samples.shape[1]
+        self.blocksize = blocksize
+        self.loop = loop  # 실시간 재생에서 끝나면 처음부터 반복
+        self.subscribers = ()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.samplerate
+
+    def blocks(self):
+        """ 처음부터 끝까지 (blocksize × 채널) 블록 (남는 샘플은 버림, 한 블록보다 짧은 소스는 무음으로 채워 둠) """
+        for start in range(0, len(self.samples) - self.blocksize + 1, self.blocksize):
+            yield self.samples[start:start + self.blocksize]
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.subscribers = self.subscribers + (callback,)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.play, daemon=True)
+                self.thread.start()
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            self.subscribers = tuple(subscriber for subscriber in self.subscribers if subscriber is not callback)
+
+    def play(self):
+        """ 블록 길이만큼의 시간 간격으로 구독자에게 전달 (구독자가 모두 빠지면 종료) """
+        status = BlockStatus()
+        interval = self.blocksize / self.samplerate
+        next_time = time.monotonic()
+        finished = False
+        try:
+            while self.subscribers:
+                for block in self.blocks():
+                    subscribers = self.subscribers
+                    if not subscribers:
+                        return
+                    for subscriber in subscribers:
+                        subscriber(block.copy(), status)
+                    next_time += interval
+                    time.sleep(max(next_time - time.monotonic(), 0.0))
+                if not self.loop:
+                    finished = True
+                    return
+        finally:
+            with self.lock:
+                self.thread = None
+                # 종료 직전에 새로 구독한 경우 다시 시작
+                if self.subscribers and not finished:
+                    self.thread = threading.Thread(target=self.play, daemon=True)
+                    self.thread.start()
+
+class FileSource(BufferedSource):
+    """ WAV(PCM 8/16/24/32비트) 또는 NumPy(.npy, .npz) 녹음 파일 소스
+
+    .npy는 (프레임,) 또는 (프레임 × 채널) 배열이고 샘플레이트를 file_samplerate로 알려줘야 한다.
+    .npz는 samples, samplerate 항목을 읽는다. samplerate가 파일과 다르면 선형 보간으로 맞춘다.
+    """
+
+    def __init__(self, path, samplerate=None, blocksize=1024, loop=False, file_samplerate=None):
+        samples, file_rate = load_audio_file(path, file_samplerate)
+        if samplerate and samplerate != file_rate:
+            samples = resample(samples, file_rate, samplerate)
+        super().__init__(samples, samplerate or file_rate, blocksize, loop)
+        self.path = path
+
+class SyntheticSource(BufferedSource):
+    """ 채널마다 주어진 주파수(여러 개면 화음)의 배음 합성음 + 잡음 (seed로 재현 가능) """
+
+    def __init__(self, freqs, samplerate=48000, blocksize=1024, duration=2.0, harmonics=4, noise=0.01, seed=0, loop=True):
+        rng = np.random.default_rng(seed)
+        t = np.arange(int(duration * samplerate)) / samplerate
+        channels = []
+        for channel_freqs in freqs:
+            channel_freqs = np.atleast_1d(channel_freqs)
+            signal = np.zeros_like(t)
+            for freq in channel_freqs:
+                for n in range(1, harmonics + 1):
+                    if freq * n < samplerate / 2:
+                        signal += np.sin(2 * np.pi * freq * n * t + rng.uniform(0, 2 * np.pi)) / n
+            signal *= 0.5 / (len(channel_freqs) * sum(1 / n for n in range(1, harmonics + 1)))
+            channels.append(signal + rng.normal(0, noise, len(t)))
+        super().__init__(np.stack(channels, axis=1), samplerate, blocksize, loop)
+
+def load_audio_file(path, samplerate=None):
+    """ 녹음 파일 → ((프레임 × 채널) float32 -1~1, 샘플레이트) """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".wav":
+        with wave.open(path, "rb") as f:
+            width = f.getsampwidth()
+            channels = f.getnchannels()
+            rate = f.getframerate()
+            raw = f.readframes(f.getnframes())
+        if width == 1:
+            samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+        elif width == 2:
+            samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+        elif width == 3:
+            # 24비트는 4바이트로 늘려 부호 확장
+            bytes3 = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+            padded = np.zeros((len(bytes3), 4), dtype=np.uint8)
+            padded[:, 1:] = bytes3
+            samples = padded.view("<i4").reshape(-1).astype(np.float32) / 2 ** 31
+        elif width == 4:
+            samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2 ** 31
+        else:
+            raise ValueError(f"지원하지 않는 WAV 샘플 크기: {width}바이트")
+        return samples.reshape(-1, channels), rate
+
+    if extension == ".npz":
+        with np.load(path) as data:
+            samples, rate = data["samples"], int(data["samplerate"])
+    elif extension == ".npy":
+        if not samplerate:
+            raise ValueError(".npy 파일은 샘플레이트를 함께 지정해야 합니다.")
+        samples, rate = np.load(path), samplerate
+    else:
+        raise ValueError(f"지원하지 않는 오디오 파일: {path}")
+
+    # 정수 배열은 해당 정수형 최대값 기준으로 정규화
+    if np.issubdtype(samples.dtype, np.integer):
+        samples = samples.astype(np.float32) / (np.iinfo(samples.dtype).max + 1)
+    samples = np.asarray(samples, dtype=np.float32)
+    return (samples.reshape(-1, 1) if samples.ndim == 1 else samples), rate
+
+def resample(samples, from_rate, to_rate):
+    """ 채널별 선형 보간 리샘플링 """
+    count = int(round(len(samples) * to_rate / from_rate))
+    source_times = np.arange(len(samples)) / from_rate
+    target_times = np.arange(count) / to_rate
+    return np.stack([np.interp(target_times, source_times, channel) for channel in samples.T], axis=1)
+
+def open_source(spec, samplerate, blocksize, channels=None, device_name=None):
+    """ 설정 문자열로 오디오 소스 생성
+
+    "live"             장치 관리자의 공유 입력 스트림 (device_name, 없으면 기본 입력 장치)
+    "live:<이름>"       이름에 <이름>이 들어간 입력 장치 (없으면 ValueError)
+    "file:<경로>"       WAV/NumPy 녹음 파일 (끝나면 반복)
+    "file:<경로>@48000" .npy의 샘플레이트 지정 (없으면 파이프라인 샘플레이트로 녹음된 것으로 봄)
+    "synth:110,196+247" 쉼표로 채널, +로 같은 채널의 화음을 구분한 합성음
+    """
+    kind, _, argument = spec.partition(":")
+    if kind == "live":
+        name = device_name
+        if argument:
+            name = device_manager.find_input(argument)
+            if name is None:
+                raise ValueError(f"이름에 '{argument}'이(가) 들어간 입력 장치를 찾을 수 없습니다.")
+        return device_manager.open_input(name, samplerate, channels, blocksize)
+    if kind == "file":
+        path, _, rate = argument.rpartition("@")
+        if not (path and rate.isdigit()):
+            path, rate = argument, None
+        file_samplerate = int(rate) if rate else samplerate
+        return FileSource(path, samplerate, blocksize, loop=True, file_samplerate=file_samplerate)
+    if kind == "synth":
+        freqs = [[float(freq) for freq in channel.split("+")] for channel in argument.split(",")]
+        return SyntheticSource(freqs, samplerate, blocksize)
+    raise ValueError(f"알 수 없는 오디오 소스: {spec} (live, live:<이름>, file:<경로>, synth:<주파수>)")
@@ -0,0 +1,87 @@
+""" 녹음 파일/합성음을 튜너 또는 코드 감지 파이프라인에 최대 속도로 흘려보내 결과와 처리량을 기록
+
+    python -m benchmark.replay tuner file:session.wav --engine yin --out readings.ndjson
+    python -m benchmark.replay chord file:bug_report.npz
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from chord_audio.chord_detector import ChordDetectorPool, SAMPLE_RATE, BUFFER_SIZE
+from tuner_audio.audio_analyzer import AudioAnalyzer
+from tuner_audio.threading_helper import SampleQueue
+from audio_io.sources import open_source
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHORD_DATA_PATH = os.path.join(ROOT_DIR, "chord_notes.json")
+
+def replay_tuner(spec, pitch_engine="hps", strum_tuning=None):
+    """ 블록마다 (시각, 채널별 주파수, 줄별 결과) 기록 """
+    source = open_source(spec, AudioAnalyzer.SAMPLING_RATE, AudioAnalyzer.CHUNK_SIZE)
+    analyzer = AudioAnalyzer(SampleQueue(), pitch_engine=pitch_engine, source=source)
+    if strum_tuning:
+        analyzer.pitch_engine.set_strum_tuning(strum_tuning)
+    records = []
+    for index, block in enumerate(source.blocks()):
+        freqs, strings = analyzer.process_block(block)
+        record = {"time": round(index * source.blocksize / source.samplerate, 4), "frequencies": [float(f) for f in freqs]}
+        if strings:
+            record["strings"] = strings
+        records.append(record)
+    return source, records
+
+def replay_chord(spec):
+    """ 블록마다 (시각, 음이름, 가중치 상위 음, 코드) 기록 (첫 채널만 사용) """
+    source = open_source(spec, SAMPLE_RATE, BUFFER_SIZE, channels=1)
+    pool = ChordDetectorPool(CHORD_DATA_PATH)
+    records = []
+    with pool.session(sample_rate=source.samplerate) as detector:
+        for index, block in enumerate(source.blocks()):
+            notes, top_notes, chord = detector.process(block[:, 0].astype(float))
+            records.append({
+                "time": round(index * source.blocksize / source.samplerate, 4),
+                "notes": list(notes),
+                "top_notes": list(top_notes),
+                "chord": list(chord) if chord else None,
+            })
+    return source, records
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="녹음 재생으로 튜너 / 코드 감지 파이프라인 실행")
+    parser.add_argument("pipeline", choices=["tuner", "chord"])
+    parser.add_argument("source", help="오디오 소스 (file:<경로>[@.npy 샘플레이트] 또는 synth:<주파수>)")
+    parser.add_argument("--engine", default="hps", help="튜너 피치 엔진")
+    parser.add_argument("--tuning", help="튜너 스트럼 튜닝 모드의 튜닝 이름")
+    parser.add_argument("--out", help="블록별 결과를 저장할 NDJSON 경로")
+    args = parser.parse_args(argv)
+    if args.source.startswith("live"):
+        parser.error("재생에는 녹음/합성 소스만 쓸 수 있습니다.")
+
+    start = time.perf_counter()
+    if args.pipeline == "tuner":
+        source, records = replay_tuner(args.source, args.engine, args.tuning)
+    else:
+        source, records = replay_chord(args.source)
+    elapsed = time.perf_counter() - start
+
+    audio_seconds = len(records) * source.blocksize / source.samplerate
+    summary = {
+        "pipeline": args.pipeline,
+        "source": args.source,
+        "blocks": len(records),
+        "audio_seconds": round(audio_seconds, 3),
+        "wall_seconds": round(elapsed, 3),
+        "blocks_per_sec": round(len(records) / elapsed, 1) if elapsed > 0 else 0.0,
+        "realtime_factor": round(audio_seconds / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    print(json.dumps(summary, ensure_ascii=False))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
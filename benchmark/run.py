@@ -0,0 +1,191 @@
+""" 합성 기타 신호로 코드 감지기 / 튜너 DSP 성능과 정확도를 측정
+
+    python -m benchmark.run --out bench.json
+    python -m benchmark.run --out new.json --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+from chord_audio.chord_detector import (
+    ChordDetectorPool, extract_dominant_freqs, freq_to_note_name, load_chord_data, SAMPLE_RATE, BUFFER_SIZE
+)
+from tuner_audio.pitch_engines import make_pitch_engine
+from benchmark.signals import strum, pluck, chord_cases, guitar_range_cases, tuning_cases
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHORD_DATA_PATH = os.path.join(ROOT_DIR, "chord_notes.json")
+TUNER_SAMPLE_RATE = 48000
+TUNER_CHUNK_SIZE = 1024
+CENTS_TOLERANCE = 5  # 튜너 정답 기준 (±센트)
+
+def summarize(latencies, **extra):
+    latencies = np.asarray(latencies)
+    total = float(latencies.sum())
+    result = {
+        "frames": int(len(latencies)),
+        "frames_per_sec": round(len(latencies) / total, 1) if total > 0 else 0.0,
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 4) if len(latencies) else 0.0,
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 4) if len(latencies) else 0.0,
+    }
+    result.update({key: round(value, 4) for key, value in extra.items()})
+    return result
+
+def split_frames(signal, frame_size):
+    return [signal[i:i + frame_size] for i in range(0, len(signal) - frame_size + 1, frame_size)]
+
+def bench_chord_detector(chord_data, rng, duration):
+    """ ChordDetector.process 전체 경로: 마지막 프레임의 코드가 정답인지 """
+    pool = ChordDetectorPool(CHORD_DATA_PATH)
+    latencies = []
+    correct = root_correct = 0
+    cases = chord_cases(chord_data)
+    for root, chord_type, freqs in cases:
+        signal = strum(freqs, duration, SAMPLE_RATE, rng)
+        chord = ("Unknown", None, None)
+        with pool.session() as detector:
+            for frame in split_frames(signal, BUFFER_SIZE):
+                start = time.perf_counter()
+                _, _, chord = detector.process(frame)
+                latencies.append(time.perf_counter() - start)
+        correct += chord[:2] == (root, chord_type)
+        root_correct += chord[0] == root
+    return summarize(latencies, accuracy=correct / len(cases), root_accuracy=root_correct / len(cases))
+
+def bench_extract_dominant_freqs(chord_data, rng, duration):
+    """ extract_dominant_freqs 단독: 코드 구성음(음이름) 중 검출된 비율 """
+    latencies = []
+    recalls = []
+    for _, _, freqs in chord_cases(chord_data):
+        expected = {freq_to_note_name(f) for f in freqs}
+        signal = strum(freqs, duration, SAMPLE_RATE, rng)
+        for frame in split_frames(signal, BUFFER_SIZE):
+            start = time.perf_counter()
+            detected = extract_dominant_freqs(frame, SAMPLE_RATE)
+            latencies.append(time.perf_counter() - start)
+            found = {freq_to_note_name(f) for f in detected}
+            recalls.append(len(expected & found) / len(expected))
+    return summarize(latencies, note_recall=float(np.mean(recalls)))
+
+def bench_tuner_engine(engine_name, rng, duration):
+    """ 튜너 피치 엔진: 청크마다 push + estimate (기타 음역 전체 + 모든 튜닝의 개방현)
+
+    버퍼가 찬 뒤의 센트 오차로 정확도를, 발현 후 처음 ±CENTS_TOLERANCE 안에 들어오기까지의 시간으로 반응 지연을 잰다.
+    """
+    latencies = []
+    errors = []
+    settle_times = []
+    chunk_seconds = TUNER_CHUNK_SIZE / TUNER_SAMPLE_RATE
+    open_strings = sorted({freq for _, freqs in tuning_cases() for freq in freqs})
+    for freq in [freq for _, freq in guitar_range_cases()] + open_strings:
+        engine = make_pitch_engine(engine_name, TUNER_SAMPLE_RATE, TUNER_CHUNK_SIZE)
+        signal = pluck(freq, duration, TUNER_SAMPLE_RATE, rng) * 0.5 * 32767
+        settled = None
+        for index, chunk in enumerate(split_frames(signal, TUNER_CHUNK_SIZE)):
+            start = time.perf_counter()
+            engine.push(chunk)
+            estimate = engine.estimate()
+            latencies.append(time.perf_counter() - start)
+            error = abs(1200 * np.log2(estimate / freq)) if estimate and estimate > 0 else np.inf
+            if settled is None and error <= CENTS_TOLERANCE:
+                settled = (index + 1) * chunk_seconds
+            if index >= engine.warmup_chunks:
+                errors.append(error)
+        settle_times.append(settled if settled is not None else duration)
+    errors = np.asarray(errors)
+    return summarize(
+        latencies,
+        accuracy=float(np.mean(errors <= CENTS_TOLERANCE)),
+        median_abs_cents=float(np.median(errors)),
+        settle_ms=float(np.mean(settle_times)) * 1000,
+    )
+
+def bench_strum_tuning(rng, duration):
+    """ 스트럼 튜닝 모드 (hps): 튜닝마다 개방현을 한 번에 친 소리에서 줄별 센트 오차가 ±CENTS_TOLERANCE 안인 비율 """
+    latencies = []
+    correct = total = 0
+    for tuning, freqs in tuning_cases():
+        engine = make_pitch_engine("hps", TUNER_SAMPLE_RATE, TUNER_CHUNK_SIZE)
+        engine.set_strum_tuning(tuning)
+        signal = strum(freqs, duration, TUNER_SAMPLE_RATE, rng) * 0.5 * 32767
+        for index, chunk in enumerate(split_frames(signal, TUNER_CHUNK_SIZE)):
+            start = time.perf_counter()
+            engine.push(chunk)
+            engine.estimate()
+            latencies.append(time.perf_counter() - start)
+            if index < engine.warmup_chunks:
+                continue
+            for reading in engine.string_readings[0]:
+                total += 1
+                correct += reading["cents"] is not None and abs(reading["cents"]) <= CENTS_TOLERANCE
+    return summarize(latencies, accuracy=correct / total if total else 0.0)
+
+def run_all(seed=0, duration=2.0, suites=None):
+    chord_data = load_chord_data(CHORD_DATA_PATH)
+    available = {
+        "chord_detector": lambda rng: bench_chord_detector(chord_data, rng, duration),
+        "extract_dominant_freqs": lambda rng: bench_extract_dominant_freqs(chord_data, rng, duration),
+        "tuner_hps": lambda rng: bench_tuner_engine("hps", rng, max(duration, 2.0)),
+        "tuner_yin": lambda rng: bench_tuner_engine("yin", rng, max(duration, 2.0)),
+        "tuner_zoom": lambda rng: bench_tuner_engine("zoom", rng, max(duration, 2.0)),
+        "tuner_strum": lambda rng: bench_strum_tuning(rng, max(duration, 2.0)),
+    }
+    results = {}
+    for name, bench in available.items():
+        if suites and name not in suites:
+            continue
+        # 스위트마다 같은 시드로 시작해 서로 독립적으로 재현 가능하게 함
+        results[name] = bench(np.random.default_rng(seed))
+    return {
+        "meta": {
+            "seed": seed,
+            "duration": duration,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+def compare(report, baseline):
+    """ 기준 결과 대비 처리량/지연/정확도 변화 """
+    lines = []
+    for name, result in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            lines.append(f"{name}: (기준 없음)")
+            continue
+        speedup = result["frames_per_sec"] / base["frames_per_sec"] if base["frames_per_sec"] else float("nan")
+        line = f"{name}: {speedup:.2f}x fps, p99 {base['p99_ms']:.3f} → {result['p99_ms']:.3f} ms"
+        for key in ("accuracy", "root_accuracy", "note_recall", "median_abs_cents", "settle_ms"):
+            if key in result and key in base:
+                line += f", {key} {base[key]:.3f} → {result[key]:.3f}"
+        lines.append(line)
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="코드 감지 / 튜너 DSP 벤치마크")
+    parser.add_argument("--out", help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duration", type=float, default=2.0, help="케이스당 신호 길이(초)")
+    parser.add_argument("--suite", action="append", help="실행할 스위트 (여러 번 지정 가능, 기본: 전부)")
+    args = parser.parse_args(argv)
+
+    report = run_all(args.seed, args.duration, args.suite)
+    print(json.dumps(report["results"], indent=2, ensure_ascii=False))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline) as f:
+            print(compare(report, json.load(f)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
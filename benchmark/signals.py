@@ -0,0 +1,65 @@
+import numpy as np
+from tuner_audio.strum_tune import TUNINGS
+
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+def midi_to_freq(midi, a4_freq=440.0):
+    return a4_freq * 2.0 ** ((midi - 69) / 12.0)
+
+def pluck(freq, duration, sample_rate, rng, harmonics=8, decay=1.5, inharmonicity=0.0001, noise=0.01, samples=None):
+    """ 발현(plucked string) 소리 합성
+
+    배음마다 진폭이 1/n로 줄고, 높은 배음일수록 빨리 감쇠하며, 줄의 강성에 의한 약한 비조화성을 넣는다.
+    samples를 주면 duration 대신 그 샘플 수만큼 만든다.
+    """
+    if samples is None:
+        samples = int(duration * sample_rate)
+    t = np.arange(samples) / sample_rate
+    signal = np.zeros_like(t)
+    for n in range(1, harmonics + 1):
+        partial = freq * n * np.sqrt(1 + inharmonicity * n * n)
+        if partial >= sample_rate / 2:
+            break
+        phase = rng.uniform(0, 2 * np.pi)
+        signal += np.sin(2 * np.pi * partial * t + phase) * np.exp(-decay * n * t) / n
+
+    # 짧은 어택 + 배경 잡음
+    attack = np.minimum(t / 0.005, 1.0)
+    signal *= attack
+    signal += rng.normal(0, noise, len(t))
+    return signal
+
+def strum(freqs, duration, sample_rate, rng, spread=0.015, **pluck_options):
+    """ 여러 줄을 spread초 간격으로 차례로 친 코드 소리 """
+    signal = np.zeros(int(duration * sample_rate))
+    for i, freq in enumerate(freqs):
+        # 남은 구간 길이를 샘플 수로 넘겨야 초 단위 반올림으로 한 샘플 넘치지 않음
+        offset = min(int(i * spread * sample_rate), len(signal))
+        signal[offset:] += pluck(freq, None, sample_rate, rng, samples=len(signal) - offset, **pluck_options)
+    peak = np.max(np.abs(signal))
+    return signal / peak * 0.8 if peak > 0 else signal
+
+def fingering_to_freqs(fingering, tuning="standard"):
+    """ chord_notes.json의 fingering(["x", 0, 2, 2, 2, 0])을 각 줄의 주파수로 변환 """
+    freqs = []
+    for (_, open_midi), fret in zip(TUNINGS[tuning], fingering):
+        if fret == "x":
+            continue
+        freqs.append(midi_to_freq(open_midi + int(fret)))
+    return freqs
+
+def chord_cases(chord_data):
+    """ (루트, 코드 종류, 주파수 목록) 목록 """
+    cases = []
+    for root, types in chord_data.items():
+        for chord_type, data in types.items():
+            cases.append((root, chord_type, fingering_to_freqs(data["fingering"])))
+    return cases
+
+def tuning_cases():
+    """ 튜닝마다 (튜닝 이름, 6번줄 → 1번줄 개방현 주파수 목록) """
+    return [(tuning, [midi_to_freq(midi) for _, midi in strings]) for tuning, strings in TUNINGS.items()]
+
+def guitar_range_cases(low=40, high=76, step=3):
+    """ 6번줄 개방현(E2)부터 1번줄 12프렛(E5)까지 step 반음 간격의 (음이름, 주파수) 목록 """
+    return [(f"{NOTE_NAMES[midi % 12]}{midi // 12 - 1}", midi_to_freq(midi)) for midi in range(low, high + 1, step)]
@@ -1,9 +1,21 @@
 import numpy as np
-import sounddevice as sd
-import scipy.fftpack as fftpack
 import json
+import logging
+import threading
 import time
 from collections import Counter, deque
+from contextlib import contextmanager
+from monitoring import metrics
+from audio_io.numpy_compat import RFFT_SUPPORTS_OUT
+
+logger = logging.getLogger(__name__)
+
+# 단계별 처리 시간 (DSP_METRICS=1 일 때만 수집)
+FFT_TIME = metrics.stage_histogram("chord", "fft")
+HPS_TIME = metrics.stage_histogram("chord", "hps")
+PEAK_TIME = metrics.stage_histogram("chord", "peak_picking")
+NOTE_TIME = metrics.stage_histogram("chord", "note_mapping")
+MATCH_TIME = metrics.stage_histogram("chord", "chord_matching")
 
 NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
 SAMPLE_RATE = 44100
@@ -12,6 +24,7 @@ WINDOW_TIME = 0.5
 HISTORY_SECONDS = 1.5
 BEAT_INTERVAL = 0.5
 HPS_HARMONICS = 4  # HPS에서 사용할 고조파 수
+FREQ_SMOOTHING_FRAMES = 3  # 주파수 이동평균에 쓰는 프레임 수
 
 # 주파수 -> 음이름 변환
 def freq_to_note_name(freq):
@@ -33,91 +46,256 @@ def load_chord_data(path='chord_notes.json'):
     with open(path, 'r') as f:
         return json.load(f)
 
-# 코드 유사도 계산
-def similarity_score(notes_detected, chord_notes_data):
-    score = 0.0
-    total_weight = 0.0
-    for note_info in chord_notes_data:
-        note = note_info["note"]
-        weight = note_info.get("weight", 1.0)
-        total_weight += weight
-        if note in notes_detected:
-            score += weight
-    return score / total_weight if total_weight > 0 else 0.0
+# 코드 종류별 부분 일치 기준 (최소 유사도, 최소 일치 음 개수)
+PARTIAL_MATCH_RULES = {
+    '5': (0.5, 2), 'maj': (0.6, 2), 'min': (0.6, 2), '7': (0.65, 3),
+    'maj7': (0.65, 3), 'm7': (0.65, 3), 'dim': (0.6, 2), 'dim7': (0.65, 3),
+    'aug': (0.6, 2), 'sus2': (0.6, 2), 'sus4': (0.6, 2), '7sus4': (0.65, 3)
+}
+DEFAULT_MATCH_RULE = (0.6, 2)
+
+# 플랫 표기를 NOTE_NAMES의 샵 표기로 통일 (chord_notes.json에 'Bb' 등이 섞여 있음)
+ENHARMONIC_NAMES = {'Db': 'C#', 'Eb': 'D#', 'Gb': 'F#', 'Ab': 'G#', 'Bb': 'A#'}
+
+def note_to_pitch_class(note):
+    note = ENHARMONIC_NAMES.get(note, note)
+    if note in NOTE_NAMES:
+        return NOTE_NAMES.index(note)
+    return None
+
+# 코드 데이터를 (코드 × 12 음정) 템플릿 행렬로 컴파일
+class ChordTemplates:
+    def __init__(self, chord_data):
+        self.labels = []
+        weights, presence, total_weights, rules = [], [], [], []
+        for chord, types in chord_data.items():
+            for chord_type, data in types.items():
+                row = np.zeros(12)
+                mask = np.zeros(12)
+                total = 0.0
+                for note_info in data['notes']:
+                    weight = note_info.get("weight", 1.0)
+                    total += weight
+                    pitch_class = note_to_pitch_class(note_info["note"])
+                    if pitch_class is not None:
+                        row[pitch_class] += weight
+                        mask[pitch_class] = 1.0
+                self.labels.append((chord, chord_type))
+                weights.append(row)
+                presence.append(mask)
+                total_weights.append(total)
+                rules.append(PARTIAL_MATCH_RULES.get(chord_type, DEFAULT_MATCH_RULE))
+
+        self.weights = np.array(weights).reshape(-1, 12)
+        self.presence = np.array(presence).reshape(-1, 12)
+        self.total_weights = np.array(total_weights)
+        rules = np.array(rules).reshape(-1, 2)
+        self.min_scores = rules[:, 0]
+        self.min_notes = rules[:, 1]
+
+        # 가중치 합이 0인 코드는 점수 0 처리 (0으로 나누기 방지)
+        valid = self.total_weights > 0
+        self.inv_total_weights = np.zeros_like(self.total_weights)
+        self.inv_total_weights[valid] = 1.0 / self.total_weights[valid]
+
+    def notes_to_vector(self, notes):
+        vector = np.zeros(12)
+        for note in notes:
+            pitch_class = note_to_pitch_class(note)
+            if pitch_class is not None:
+                vector[pitch_class] = 1.0
+        return vector
+
+    def match(self, notes):
+        vector = self.notes_to_vector(notes)
+        # 합산 순서에 따른 부동소수 오차로 동점 코드의 순위가 바뀌지 않도록 반올림
+        scores = np.round((self.weights @ vector) * self.inv_total_weights, 9)
+        matched_counts = self.presence @ vector
+
+        # partial_match_rules 기준을 벡터 마스크로 적용
+        valid = (matched_counts >= self.min_notes) & (scores >= self.min_scores) & (scores > 0)
+        if not valid.any():
+            return "Unknown", None, 0.0
+        masked_scores = np.where(valid, scores, -1.0)
+        best = int(np.argmax(masked_scores))
+        chord, chord_type = self.labels[best]
+        return chord, chord_type, float(scores[best])
+
+def compile_chord_templates(chord_data):
+    if isinstance(chord_data, ChordTemplates):
+        return chord_data
+    return ChordTemplates(chord_data)
 
 # 코드 추정
 def detect_chord_from_notes(notes, chord_data):
-    note_set = set(notes)
-    best_match = ("Unknown", None, 0.0)
-    partial_match_rules = {
-        '5': (0.5, 2), 'maj': (0.6, 2), 'min': (0.6, 2), '7': (0.65, 3),
-        'maj7': (0.65, 3), 'm7': (0.65, 3), 'dim': (0.6, 2), 'dim7': (0.65, 3),
-        'aug': (0.6, 2), 'sus2': (0.6, 2), 'sus4': (0.6, 2), '7sus4': (0.65, 3)
-    }
-    for chord, types in chord_data.items():
-        for chord_type, data in types.items():
-            chord_notes_data = data['notes']
-            chord_note_names = [n["note"] for n in chord_notes_data]
-            matched_notes = note_set.intersection(set(chord_note_names))
-            matched_count = len(matched_notes)
-            min_score, min_notes_required = partial_match_rules.get(chord_type, (0.6, 2))
-            if matched_count >= min_notes_required:
-                score = similarity_score(note_set, chord_notes_data)
-                if score > best_match[2] and score >= min_score:
-                    best_match = (chord, chord_type, score)
-    if best_match[2] > 0:
-        return best_match[0], best_match[1], '추정'
+    templates = compile_chord_templates(chord_data)
+    chord, chord_type, score = templates.match(notes)
+    if score > 0:
+        return chord, chord_type, '추정'
     return "Unknown", None, None
 
-def weighted_note_score(note_history, chord_data):
-    score_counter = Counter()
-    for frame in note_history:
-        for note in frame:
-            for chord in chord_data.values():
-                for chord_type in chord.values():
-                    for note_info in chord_type['notes']:
-                        if note_info['note'] == note:
-                            weight = note_info.get("weight", 1.0)
-                            score_counter[note] += weight
-    return [note for note, _ in score_counter.most_common()]
+# 음이름별 가중치 합 인덱스 (chord_notes.json이 같으면 항상 같은 값이므로 한 번만 계산)
+# 템플릿과 같이 플랫 표기는 freq_to_note_name이 내는 샵 이름으로 모음 (Bb -> A#)
+def build_note_weight_index(chord_data):
+    index = Counter()
+    for chord in chord_data.values():
+        for chord_type in chord.values():
+            for note_info in chord_type['notes']:
+                note = ENHARMONIC_NAMES.get(note_info['note'], note_info['note'])
+                index[note] += note_info.get("weight", 1.0)
+    return dict(index)
+
+# 최근 프레임 목록과 값별 등장 횟수를 슬라이딩 윈도우로 함께 유지
+# (새 프레임은 더하고 밀려나는 프레임은 빼서 매 프레임 전체를 다시 세지 않음)
+class SlidingWindowCounter:
+    def __init__(self, maxlen):
+        self.frames = deque(maxlen=maxlen)
+        self.counts = Counter()
+
+    def append(self, values):
+        # 가득 찬 경우 밀려나는 프레임의 값을 먼저 빼줌
+        if self.frames.maxlen is not None and len(self.frames) == self.frames.maxlen:
+            for value in self.frames[0]:
+                self.counts[value] -= 1
+                if self.counts[value] <= 0:
+                    del self.counts[value]
+        self.frames.append(values)
+        self.counts.update(values)
+
+    def most_common(self, k):
+        return [value for value, _ in self.counts.most_common(k)]
+
+    def clear(self):
+        self.frames.clear()
+        self.counts.clear()
+
+    def __iter__(self):
+        return iter(self.frames)
+
+    def __len__(self):
+        return len(self.frames)
+
+def weighted_note_score(note_counts, note_weights):
+    scores = {note: count * note_weights[note] for note, count in note_counts.items() if note in note_weights}
+    return sorted(scores, key=scores.get, reverse=True)
 
 # HPS 적용한 주파수 추출 + 이동평균 적용
 class FrequencyStabilizer:
-    def __init__(self, window_len=5):
-        self.freq_history = deque(maxlen=window_len)
+    def __init__(self, window_len=5, top_k=6):
+        self.freq_history = SlidingWindowCounter(maxlen=window_len)
+        self.top_k = top_k
 
     def smooth(self, freqs):
         self.freq_history.append(freqs)
-        all_freqs = [f for frame in self.freq_history for f in frame]
-        counts = Counter(all_freqs)
-        most_common = [freq for freq, _ in counts.most_common(6)]
-        return sorted(set(most_common))
+        return sorted(self.freq_history.most_common(self.top_k))
+
+# 버퍼 크기/샘플레이트별로 창 함수, 대역 마스크, HPS 인덱스를 미리 계산해두는 스펙트럼 전처리기
+class SpectralFrontEnd:
+    def __init__(self, buffer_size, sample_rate, min_freq=80, max_freq=800, harmonics=HPS_HARMONICS, threshold=0.3):
+        self.buffer_size = buffer_size
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.window = np.hanning(buffer_size)
+
+        # 80~800Hz 대역은 연속 구간이므로 마스크 대신 슬라이스로 보관
+        all_freqs = np.fft.rfftfreq(buffer_size, 1 / sample_rate)[:buffer_size // 2]
+        band = np.flatnonzero((all_freqs >= min_freq) & (all_freqs <= max_freq))
+        self.band = slice(band[0], band[-1] + 1) if len(band) else slice(0, 0)
+        self.freqs = all_freqs[self.band]
+        band_len = len(self.freqs)
+
+        # HPS 다운샘플링은 (적용 길이, 간격 슬라이스) 쌍으로 미리 계산
+        self.hps_steps = [(len(range(0, band_len, h)), slice(None, None, h)) for h in range(2, harmonics + 1)]
+
+        # 크로마그램용 빈별 음정 클래스 (C=0)
+        with np.errstate(divide='ignore'):
+            midi = 69 + 12 * np.log2(self.freqs / 440.0)
+        self.pitch_classes = np.mod(np.round(midi), 12).astype(np.intp)
+
+        self._windowed = np.empty(buffer_size)
+        self._complex = np.empty(buffer_size // 2 + 1, dtype=np.complex128)
+        self.spectrum = np.empty(band_len)
+        self.hps_spectrum = np.empty(band_len)
+
+    def transform(self, audio):
+        start = metrics.now()
+        np.multiply(audio, self.window, out=self._windowed)
+        if RFFT_SUPPORTS_OUT:
+            np.fft.rfft(self._windowed, out=self._complex)
+            complex_spectrum = self._complex
+        else:
+            complex_spectrum = np.fft.rfft(self._windowed)
+        np.abs(complex_spectrum[self.band], out=self.spectrum)
+        FFT_TIME.observe_since(start)
+        return self.spectrum
+
+    def harmonic_product(self):
+        start = metrics.now()
+        np.copyto(self.hps_spectrum, self.spectrum)
+        for length, step in self.hps_steps:
+            self.hps_spectrum[:length] *= self.spectrum[step]
+        HPS_TIME.observe_since(start)
+        return self.hps_spectrum
+
+    def dominant_freqs(self, audio, top_n=6):
+        if len(self.freqs) == 0:
+            return []
+        self.transform(audio)
+        hps_spectrum = self.harmonic_product()
+
+        # 강한 주파수 탐색
+        start = metrics.now()
+        threshold = np.max(hps_spectrum) * self.threshold
+        strong_indices = np.flatnonzero(hps_spectrum >= threshold)
+        if len(strong_indices) == 0:
+            return []
+
+        effective_top_n = min(top_n, len(strong_indices))
+        peak_indices = strong_indices[np.argpartition(hps_spectrum[strong_indices], -effective_top_n)[-effective_top_n:]]
+        dominant_freqs = sorted(self.freqs[peak_indices])
+        PEAK_TIME.observe_since(start)
+        return dominant_freqs
+
+    def dominant_freqs_batch(self, frames, top_n=6):
+        # (프레임 수 × buffer_size) 배열을 한 번의 rfft로 처리 (오프라인 분석용)
+        if len(self.freqs) == 0:
+            return [[] for _ in range(len(frames))]
+        spectrum = np.abs(np.fft.rfft(frames * self.window, axis=1)[:, self.band])
+        hps_spectrum = spectrum.copy()
+        for length, step in self.hps_steps:
+            hps_spectrum[:, :length] *= spectrum[:, step]
+
+        strong = hps_spectrum >= hps_spectrum.max(axis=1, keepdims=True) * self.threshold
+        effective_top_n = min(top_n, hps_spectrum.shape[1])
+        candidates = np.where(strong, hps_spectrum, -np.inf)
+        peak_indices = np.argpartition(candidates, -effective_top_n, axis=1)[:, -effective_top_n:]
+        peak_strong = np.take_along_axis(strong, peak_indices, axis=1)
+        return [sorted(self.freqs[indices[keep]]) for indices, keep in zip(peak_indices, peak_strong)]
+
+    def chroma(self, audio=None):
+        # audio를 생략하면 직전 transform 결과로 12빈 크로마그램 계산
+        if audio is not None:
+            self.transform(audio)
+        chromagram = np.bincount(self.pitch_classes, weights=self.spectrum, minlength=12)
+        peak = chromagram.max()
+        return chromagram / peak if peak > 0 else chromagram
+
+# 스레드마다 (버퍼 크기, 샘플레이트, 대역)별 전처리기를 하나씩 재사용 (내부 버퍼를 공유하지 않도록)
+_front_end_cache = threading.local()
+
+def get_spectral_front_end(buffer_size, sample_rate, min_freq=80, max_freq=800):
+    cache = getattr(_front_end_cache, 'front_ends', None)
+    if cache is None:
+        cache = _front_end_cache.front_ends = {}
+    key = (buffer_size, sample_rate, min_freq, max_freq)
+    front_end = cache.get(key)
+    if front_end is None:
+        front_end = cache[key] = SpectralFrontEnd(buffer_size, sample_rate, min_freq, max_freq)
+    return front_end
 
 def extract_dominant_freqs(audio, sample_rate, top_n=6, min_freq=80, max_freq=800):
-    window = np.hanning(len(audio))
-    spectrum = np.abs(fftpack.fft(audio * window))[:len(audio) // 2]
-    freqs = np.fft.fftfreq(len(audio), 1 / sample_rate)[:len(audio) // 2]
-
-    valid_indices = np.where((freqs >= min_freq) & (freqs <= max_freq))
-    spectrum = spectrum[valid_indices]
-    freqs = freqs[valid_indices]
-
-    # HPS 알고리즘 적용
-    hps_spectrum = np.copy(spectrum)
-    for h in range(2, 5):
-        decimated = spectrum[::h]
-        hps_spectrum[:len(decimated)] *= decimated
-
-    # 강한 주파수 탐색
-    threshold = np.max(hps_spectrum) * 0.3  # threshold를 조금 높임
-    strong_indices = np.where(hps_spectrum >= threshold)[0]
-    if len(strong_indices) == 0:
-        return []
-
-    effective_top_n = min(top_n, len(strong_indices))
-    peak_indices = strong_indices[np.argpartition(hps_spectrum[strong_indices], -effective_top_n)[-effective_top_n:]]
-    dominant_freqs = sorted(freqs[peak_indices])
-    return dominant_freqs
+    front_end = get_spectral_front_end(len(audio), sample_rate, min_freq, max_freq)
+    return front_end.dominant_freqs(audio, top_n)
 
 # 중복 음 제거 및 필터링
 def remove_octave_duplicates(note_list):
@@ -129,29 +307,43 @@ def remove_octave_duplicates(note_list):
             filtered_notes.append(note)
     return filtered_notes
 
-def remove_rare_notes(note_list, history_deque, min_count=2):
-    all_notes = [n for sub in history_deque for n in sub]
-    valid_notes = [n for n in note_list if all_notes.count(n) >= min_count]
+def remove_rare_notes(note_list, note_counts, min_count=2):
+    valid_notes = [n for n in note_list if note_counts.get(n, 0) >= min_count]
     return valid_notes
 
 # 코드 감지기 클래스
 class ChordDetector:
-    def __init__(self):
-        self.chord_data = load_chord_data()
-        self.note_history = deque(maxlen=int(HISTORY_SECONDS / WINDOW_TIME))
+    def __init__(self, chord_data=None, chord_templates=None, note_weights=None, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        # 풀에서 만들 때는 이미 읽고 컴파일한 데이터를 그대로 공유
+        self.chord_data = chord_data if chord_data is not None else load_chord_data()
+        self.chord_templates = chord_templates or compile_chord_templates(self.chord_data)
+        self.note_weights = note_weights if note_weights is not None else build_note_weight_index(self.chord_data)
+        self.note_history = SlidingWindowCounter(maxlen=int(HISTORY_SECONDS / WINDOW_TIME))
+        self.freq_smoother = FrequencyStabilizer(window_len=FREQ_SMOOTHING_FRAMES)
+        self.reset()
+
+    def reset(self):
+        # 세션별 상태만 초기화 (코드 데이터는 유지)
+        self.note_history.clear()
+        self.freq_smoother.freq_history.clear()
         self.last_beat_time = time.time()
         self.previous_chord = None
         self.chord_repeat_count = 0
         self.confirmed_chord = None
-        self.freq_smoother = FrequencyStabilizer(window_len=3)
 
     def process(self, audio_chunk):
         # 주파수 추출
-        raw_freqs = extract_dominant_freqs(audio_chunk, SAMPLE_RATE)
-        
-        # 주파수 및 음표 출력
-        print(f"[주파수] {np.round(raw_freqs, 2)}")
+        raw_freqs = extract_dominant_freqs(audio_chunk, self.sample_rate)
         
+        # 주파수 출력 (매 프레임이므로 디버그 로그로만)
+        logger.debug("[주파수] %s", raw_freqs)
+
+        return self.process_freqs(raw_freqs)
+
+    def process_freqs(self, raw_freqs):
+        # 이미 추출한 주파수로 나머지 단계 수행 (오프라인 일괄 처리에서 사용)
+        start = metrics.now()
         smoothed_freqs = self.freq_smoother.smooth(raw_freqs)
         
         # 주파수 기반 음표 변환
@@ -159,13 +351,16 @@ class ChordDetector:
         filtered_notes = remove_octave_duplicates(raw_notes)
         
         self.note_history.append(filtered_notes)
-        smoothed_notes = remove_rare_notes(filtered_notes, self.note_history)
+        smoothed_notes = remove_rare_notes(filtered_notes, self.note_history.counts)
+        NOTE_TIME.observe_since(start)
 
         # 가중치 기반 주요 노트 계산
-        most_common_notes = weighted_note_score(self.note_history, self.chord_data)[:5]
+        start = metrics.now()
+        most_common_notes = weighted_note_score(self.note_history.counts, self.note_weights)[:5]
 
         # 코드 추정
-        chord = detect_chord_from_notes(most_common_notes, self.chord_data)
+        chord = detect_chord_from_notes(most_common_notes, self.chord_templates)
+        MATCH_TIME.observe_since(start)
 
         # 주기마다 코드 감지
         now = time.time()
@@ -181,4 +376,44 @@ class ChordDetector:
                     self.confirmed_chord = chord[:2]
                     print(f"[코드 전환] {self.confirmed_chord[0]} {self.confirmed_chord[1]}")
 
-        return smoothed_notes, most_common_notes, chord
\ No newline at end of file
+        return smoothed_notes, most_common_notes, chord
+
+# 코드 데이터는 한 번만 읽고 컴파일한 뒤, 웹소켓 세션마다 독립된 ChordDetector를 나눠주는 풀
+class ChordDetectorPool:
+    def __init__(self, path='chord_notes.json', max_idle=8):
+        self.path = path
+        self.max_idle = max_idle
+        self.lock = threading.Lock()
+        self.idle = []
+        self.shared = None
+
+    def load(self):
+        with self.lock:
+            if self.shared is None:
+                chord_data = load_chord_data(self.path)
+                self.shared = (chord_data, compile_chord_templates(chord_data), build_note_weight_index(chord_data))
+            return self.shared
+
+    def acquire(self, sample_rate=SAMPLE_RATE):
+        chord_data, chord_templates, note_weights = self.load()
+        with self.lock:
+            if self.idle:
+                detector = self.idle.pop()
+                detector.sample_rate = sample_rate
+                detector.reset()
+                return detector
+        return ChordDetector(chord_data, chord_templates, note_weights, sample_rate)
+
+    def release(self, detector):
+        # 쉬는 상태 객체는 max_idle개까지만 남겨 재사용
+        with self.lock:
+            if len(self.idle) < self.max_idle:
+                self.idle.append(detector)
+
+    @contextmanager
+    def session(self, sample_rate=SAMPLE_RATE):
+        detector = self.acquire(sample_rate)
+        try:
+            yield detector
+        finally:
+            self.release(detector)
@@ -0,0 +1,97 @@
+import os
+import subprocess
+import numpy as np
+from chord_audio.chord_detector import (
+    ChordDetectorPool, get_spectral_front_end, SAMPLE_RATE, BUFFER_SIZE,
+    HISTORY_SECONDS, WINDOW_TIME, FREQ_SMOOTHING_FRAMES
+)
+
+# 오프라인 코드 타임라인 추출 설정
+HOP_SIZE = BUFFER_SIZE  # 실시간 루프와 같은 블록 간격으로 분석
+BATCH_FRAMES = 256  # 한 번의 rfft로 처리할 프레임 수
+SEGMENT_SECONDS = 30  # 프로세스 풀 작업 하나가 맡는 구간 길이
+WARMUP_FRAMES = max(int(HISTORY_SECONDS / WINDOW_TIME), FREQ_SMOOTHING_FRAMES)  # 감지기 히스토리를 채우는 데 필요한 프레임 수
+FFMPEG_PATH = os.getenv("FFMPEG_PATH", "ffmpeg")
+
+# 워커 프로세스마다 코드 데이터를 한 번만 읽도록 모듈 단위 풀 사용
+detector_pool = ChordDetectorPool()
+
+def decode_audio(path, sample_rate=SAMPLE_RATE):
+    """ ffmpeg로 오디오 파일을 모노 float32 샘플 배열로 디코딩 """
+    result = subprocess.run(
+        [FFMPEG_PATH, "-v", "error", "-i", path, "-f", "f32le", "-ac", "1", "-ar", str(sample_rate), "-"],
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg 디코딩 실패: {result.stderr.decode(errors='ignore').strip()}")
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+def frame_view(samples, hop_size=HOP_SIZE, frame_size=BUFFER_SIZE):
+    """ 샘플 배열을 복사 없이 (프레임 수 × frame_size) 뷰로 변환 """
+    if len(samples) < frame_size:
+        return np.empty((0, frame_size), dtype=samples.dtype)
+    return np.lib.stride_tricks.sliding_window_view(samples, frame_size)[::hop_size]
+
+def detect_segment(samples, sample_rate, first_frame, warmup_frames):
+    """ 구간의 프레임별 (프레임 번호, 루트, 코드 종류) 목록을 반환
+
+    앞쪽 warmup_frames개는 이전 구간과 겹치는 부분으로, 감지기 히스토리를 채우는 데만 쓰고 버린다.
+    """
+    front_end = get_spectral_front_end(BUFFER_SIZE, sample_rate)
+    frames = frame_view(samples)
+    chords = []
+    with detector_pool.session(sample_rate) as detector:
+        for start in range(0, len(frames), BATCH_FRAMES):
+            batch = frames[start:start + BATCH_FRAMES].astype(np.float64)
+            for offset, raw_freqs in enumerate(front_end.dominant_freqs_batch(batch)):
+                _, _, chord = detector.process_freqs(raw_freqs)
+                index = start + offset
+                if index >= warmup_frames:
+                    chords.append((first_frame + index - warmup_frames, chord[0], chord[1]))
+    return chords
+
+def split_segments(samples, sample_rate=SAMPLE_RATE, segment_seconds=SEGMENT_SECONDS):
+    """ 긴 파일을 (구간 샘플, 시작 프레임 번호, 워밍업 프레임 수) 작업 단위로 나눔 """
+    frames_per_segment = max(1, int(segment_seconds * sample_rate) // HOP_SIZE)
+    total_frames = len(frame_view(samples))
+    segments = []
+    for first_frame in range(0, total_frames, frames_per_segment):
+        frame_count = min(frames_per_segment, total_frames - first_frame)
+        segment_warmup = min(WARMUP_FRAMES, first_frame)
+        start = (first_frame - segment_warmup) * HOP_SIZE
+        stop = (first_frame + frame_count - 1) * HOP_SIZE + BUFFER_SIZE
+        segments.append((samples[start:stop], first_frame, segment_warmup))
+    return segments
+
+class TimelineBuilder:
+    """ 프레임별 코드를 같은 코드끼리 묶어 (시작, 끝, 코드) 구간으로 변환 """
+
+    def __init__(self, sample_rate=SAMPLE_RATE):
+        self.hop_seconds = HOP_SIZE / sample_rate
+        self.current = None  # [시작 프레임, 끝 프레임, 루트, 종류]
+
+    def add(self, frame_chords):
+        """ 새 프레임들을 추가하고 확정된(코드가 바뀐) 구간들을 반환 """
+        closed = []
+        for frame, root, chord_type in frame_chords:
+            if self.current and self.current[2:] == [root, chord_type] and self.current[1] == frame:
+                self.current[1] = frame + 1
+                continue
+            if self.current:
+                closed.append(self.to_entry(self.current))
+            self.current = [frame, frame + 1, root, chord_type]
+        return closed
+
+    def finish(self):
+        closed = [self.to_entry(self.current)] if self.current else []
+        self.current = None
+        return closed
+
+    def to_entry(self, current):
+        start, end, root, chord_type = current
+        return {
+            "start": round(start * self.hop_seconds, 3),
+            "end": round(end * self.hop_seconds, 3),
+            "root": root,
+            "type": chord_type,
+        }
@@ -0,0 +1 @@
+# 저장소 루트를 sys.path에 넣어 tests/에서 function, chord_audio 등을 바로 import하게 함 (pytest rootdir conftest)
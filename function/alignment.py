@@ -0,0 +1,81 @@
+""" Sakoe-Chiba 대역으로 제한한 DTW(동적 시간 정합)로 두 특징 열을 맞추는 비교
+
+index끼리 비교하면 음 하나를 더 치거나 빼먹었을 때 그 뒤가 모두 어긋나므로, 정합 경로를 따라 틀린 음만 센다.
+대각선 주변 band 칸만 계산해 메모리는 O(n·band)이고, 한 줄 안의 가로 이동은 누적 최솟값으로 한꺼번에 구한다.
+"""
+import numpy as np
+
+BAND_RATIO = 0.1  # 대역 반폭: 긴 쪽 길이의 10%
+MIN_BAND = 8  # 짧은 곡에서도 음 몇 개의 밀림은 따라가도록
+BLOCK_ROWS = 256  # 비용/누적합을 미리 계산하는 줄 수 (임시 메모리를 O(BLOCK_ROWS·band)로 제한)
+
+# 역추적용 이전 칸 방향
+DIAGONAL, UP, LEFT = 0, 1, 2
+
+def default_band(n, m):
+    return max(MIN_BAND, int(np.ceil(BAND_RATIO * max(n, m))))
+
+def band_limits(n, m, band):
+    """ 줄(i)마다 계산할 열 범위 [lo, hi] (대각선 i·(m-1)/(n-1) 기준 ± band) """
+    centers = np.arange(n) * ((m - 1) / (n - 1)) if n > 1 else np.zeros(1)
+    lo = np.clip(np.floor(centers - band), 0, m - 1).astype(np.int64)
+    hi = np.clip(np.ceil(centers + band), 0, m - 1).astype(np.int64)
+    lo[0], hi[-1] = 0, m - 1
+    # 이웃한 줄의 범위가 이어져야 경로가 끊기지 않음
+    hi = np.maximum(hi, np.concatenate([lo[1:], [m - 1]]))
+    return lo, hi
+
+def banded_dtw(seq1, seq2, tolerance, band=None):
+    """ tolerance 밖이면 비용 1인 DTW → (틀린 칸 수, 정합 경로 [(i, j)], 칸별 틀림 여부)
+
+    seq1, seq2는 비어 있지 않은 1차원 배열. 경로는 (0, 0)에서 (n-1, m-1)까지 i, j가 줄지 않는 순서다.
+    """
+    seq1 = np.asarray(seq1, dtype=float)
+    seq2 = np.asarray(seq2, dtype=float)
+    n, m = len(seq1), len(seq2)
+    lo, hi = band_limits(n, m, default_band(n, m) if band is None else band)
+    width = int((hi - lo).max()) + 1
+
+    shifts = np.diff(lo, prepend=0)
+    steps = np.empty((n, width), dtype=np.int8)
+    # 윗줄 앞에 inf 한 칸, 뒤에 최대 이동량만큼 inf를 붙여 두고 뷰로 위/대각선 값을 꺼냄
+    padded = np.full(width + int(shifts.max()) + 1, np.inf)
+    padded[0] = 0.0  # (0, 0)의 대각선 = 시작
+    for block in range(0, n, BLOCK_ROWS):
+        rows = slice(block, min(block + BLOCK_ROWS, n))
+        # 블록 안 대역 칸의 비용과 줄별 누적합을 한 번에 계산. 대역 밖 칸은 어떤 경로보다 비싼 유한값이라 경로에 들어가지 않는다.
+        columns = lo[rows, None] + np.arange(width)
+        costs = (np.abs(seq1[rows, None] - seq2[np.minimum(columns, m - 1)]) > tolerance).astype(float)
+        costs[columns > hi[rows, None]] = n + m
+        totals = np.cumsum(costs, axis=1)
+
+        for row in range(len(costs)):
+            shift = shifts[block + row]
+            up = padded[shift + 1:shift + 1 + width]
+            diagonal = padded[shift:shift + width]
+            entry = costs[row] + np.minimum(diagonal, up)
+
+            # 가로 이동: D[j] = S[j] + min_{k<=j}(entry[k] - S[k]), S는 줄 안의 누적 비용
+            current = totals[row] + np.minimum.accumulate(entry - totals[row])
+            steps[block + row] = np.where(current < entry, LEFT, diagonal > up)
+            padded[0] = np.inf
+            padded[1:width + 1] = current
+
+    # (n-1, m-1)에서 거꾸로 따라감
+    path = []
+    i, j = n - 1, m - 1
+    while True:
+        path.append((i, j))
+        if i == 0 and j == 0:
+            break
+        step = steps[i, j - lo[i]]
+        if step == DIAGONAL:
+            i, j = i - 1, j - 1
+        elif step == UP:
+            i -= 1
+        else:
+            j -= 1
+    path.reverse()
+    path = np.array(path, dtype=np.int64)
+    mismatches = np.abs(seq1[path[:, 0]] - seq2[path[:, 1]]) > tolerance
+    return int(mismatches.sum()), path, mismatches
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+import os
+import tempfile
+from chord_audio.chord_timeline import decode_audio, detect_segment, split_segments, TimelineBuilder
+from chord_audio.chord_detector import SAMPLE_RATE
+from function.process_pool import get_executor
+
+chordchart_router = APIRouter()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MUSIC_DIR = os.path.join(BASE_DIR, "..", "uploads", "music")
+
+async def stream_timeline(samples, sample_rate=SAMPLE_RATE):
+    """ 구간별 작업을 풀에 모두 넣고, 끝나는 순서대로(시간 순) NDJSON 줄을 내보냄 """
+    loop = asyncio.get_event_loop()
+    pool = get_executor()
+    futures = [
+        loop.run_in_executor(pool, detect_segment, segment, sample_rate, first_frame, warmup)
+        for segment, first_frame, warmup in split_segments(samples, sample_rate)
+    ]
+    builder = TimelineBuilder(sample_rate)
+    try:
+        for future in futures:
+            for entry in builder.add(await future):
+                yield json.dumps(entry, ensure_ascii=False) + "\n"
+        for entry in builder.finish():
+            yield json.dumps(entry, ensure_ascii=False) + "\n"
+        yield json.dumps({"done": True, "duration": round(len(samples) / sample_rate, 3)}) + "\n"
+    finally:
+        for future in futures:
+            future.cancel()
+
+async def decode_or_400(path):
+    try:
+        return await asyncio.get_event_loop().run_in_executor(None, decode_audio, path)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"오디오 디코딩 실패: {str(e)}")
+
+# 🟢 업로드한 오디오 파일의 코드 타임라인 추출
+@chordchart_router.post("/chord-timeline/")
+async def chord_timeline_from_upload(file: UploadFile = File(...)):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        audio_path = os.path.join(tmpdir, os.path.basename(file.filename) or "upload")
+        with open(audio_path, "wb") as f:
+            f.write(await file.read())
+        samples = await decode_or_400(audio_path)
+
+    return StreamingResponse(stream_timeline(samples), media_type="application/x-ndjson")
+
+# 🟢 uploads/music에 저장된 곡의 코드 타임라인 추출
+@chordchart_router.get("/chord-timeline/{filename}")
+async def chord_timeline_from_library(filename: str):
+    audio_path = os.path.join(MUSIC_DIR, filename)
+    if os.path.basename(filename) != filename or not os.path.isfile(audio_path):
+        raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
+    samples = await decode_or_400(audio_path)
+
+    return StreamingResponse(stream_timeline(samples), media_type="application/x-ndjson")
@@ -1,11 +1,75 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 import asyncio
+import os
+import threading
 import numpy as np
-import sounddevice as sd
-from chord_audio.chord_detector import ChordDetector, SAMPLE_RATE, BUFFER_SIZE, WINDOW_TIME
+from collections import deque
+from chord_audio.chord_detector import ChordDetectorPool, SAMPLE_RATE, BUFFER_SIZE, WINDOW_TIME
+from monitoring import metrics
+from audio_io.sources import open_source
 
 chordprac_router = APIRouter()
-detector = ChordDetector()
+detector_pool = ChordDetectorPool()
+
+# 클라이언트 PCM 스트리밍 모드에서 허용하는 샘플 포맷 (numpy dtype, -1~1 정규화 배율)
+STREAM_FORMATS = {
+    "int16": (np.dtype("<i2"), 1.0 / 32768),
+    "float32": (np.dtype("<f4"), 1.0),
+}
+STREAM_SAMPLE_RATES = (8000, 192000)  # 허용 샘플레이트 범위
+STREAM_QUEUE_SIZE = 8  # 처리 대기 블록 수 (넘치면 가장 오래된 블록부터 버림)
+CALLBACK_RING_SIZE = 4  # 오디오 콜백과 DSP 스레드 사이의 블록 링 크기
+# 오디오 소스 ("live" 기본, 장치 없이 녹음을 재생할 때는 "file:<경로>", audio_io.sources.open_source 참고)
+AUDIO_SOURCE = os.getenv("CHORDPRAC_AUDIO_SOURCE", "live")
+
+SEND_TIME = metrics.stage_histogram("chord", "websocket_send")
+INPUT_OVERFLOWS = metrics.input_overflows("chord")
+RING_DROPS = metrics.dropped_frames("chord", "callback_ring_full")
+STREAM_DROPS = metrics.dropped_frames("chord_stream", "queue_full")
+COALESCED_RESULTS = metrics.registry.counter(
+    "chord_coalesced_results_total", "Chord results overwritten before they could be sent")
+
+def build_result(freqs, notes, chord):
+    return {
+        "frequencies": np.round(freqs, 2).tolist() if isinstance(freqs, np.ndarray) else [],
+        "notes": notes if notes else [],
+        "chord": {
+            "root": chord[0] if chord else "",
+            "type": chord[1] if chord else "",
+            "certainty": chord[2] if chord else 0.0
+        }
+    }
+
+class LatestResult:
+    """ DSP 스레드가 쓰고 이벤트 루프가 읽는 최신 결과 한 칸
+
+    전송이 밀리는 동안 새 결과가 오면 이전 결과를 덮어쓴다(합치기).
+    읽고 비우는 사이에 들어온 결과를 잃지 않도록 value는 락 안에서만 다룬다.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.value = None
+        self.coalesced = 0
+        self.lock = threading.Lock()
+        self.ready = asyncio.Event()
+
+    def publish(self, value):
+        # DSP 스레드에서 호출
+        with self.lock:
+            if self.value is not None:
+                self.coalesced += 1
+                COALESCED_RESULTS.inc()
+            self.value = value
+        self.loop.call_soon_threadsafe(self.ready.set)
+
+    async def take(self):
+        # 이벤트 루프에서 호출 (이미 가져간 뒤 깨어난 경우 None)
+        await self.ready.wait()
+        self.ready.clear()
+        with self.lock:
+            value, self.value = self.value, None
+        return value
 
 @chordprac_router.websocket("/ws/chordprac")
 async def websocket_endpoint(websocket: WebSocket):
@@ -14,46 +78,69 @@ async def websocket_endpoint(websocket: WebSocket):
 
     stop_event = asyncio.Event()
     loop = asyncio.get_event_loop()
+    detector = detector_pool.acquire()  # 세션마다 독립된 감지 상태
 
-    def audio_callback(indata, frames, time_info, status):
-        if stop_event.is_set():
-            return
+    # 콜백 → DSP 스레드: 작은 링(가득 차면 가장 오래된 블록이 밀려남), DSP 스레드 → 전송 태스크: 최신 결과 한 칸
+    chunks = deque(maxlen=CALLBACK_RING_SIZE)
+    chunk_ready = threading.Event()
+    dsp_stop = threading.Event()
+    latest = LatestResult(loop)
+    stats = {"dropped_blocks": 0, "input_overflows": 0}
 
-        try:
-            audio = indata[:, 0]
-            freqs, notes, chord = detector.process(audio)
-
-            result = {
-                "frequencies": np.round(freqs, 2).tolist() if isinstance(freqs, np.ndarray) else [],
-                "notes": notes if notes else [],
-                "chord": {
-                    "root": chord[0] if chord else "",
-                    "type": chord[1] if chord else "",
-                    "certainty": chord[2] if chord else 0.0
-                }
-            }
-
-            # websocket이 살아있을 때만 전송
-            if not stop_event.is_set():
-                future = asyncio.run_coroutine_threadsafe(websocket.send_json(result), loop)
-                future.result()
-        except Exception as e:
-            print("Error in audio_callback:", e)
-            stop_event.set()
+    def audio_callback(indata, status):
+        # PortAudio 실시간 스레드: 복사해서 링에 넣고 깨우기만 함
+        if status.input_overflow:
+            stats["input_overflows"] += 1
+            INPUT_OVERFLOWS.inc()
+        if len(chunks) == chunks.maxlen:
+            stats["dropped_blocks"] += 1
+            RING_DROPS.inc()
+        chunks.append(indata[:, 0].copy())
+        chunk_ready.set()
+
+    def dsp_worker():
+        while not dsp_stop.is_set():
+            if not chunk_ready.wait(timeout=WINDOW_TIME):
+                continue
+            chunk_ready.clear()
+            while chunks and not dsp_stop.is_set():
+                try:
+                    freqs, notes, chord = detector.process(chunks.popleft())
+                    latest.publish(build_result(freqs, notes, chord))
+                except Exception as e:
+                    print("Error in dsp_worker:", e)
+
+    async def send_loop():
+        while not stop_event.is_set():
+            result = await latest.take()
+            if result is None:
+                continue
+            try:
+                start = metrics.now()
+                await websocket.send_json(result)
+                SEND_TIME.observe_since(start)
+            except Exception as e:
+                print("Send error:", e)
+                stop_event.set()
 
     async def audio_stream_loop():
+        # 같은 설정의 세션들은 장치 관리자의 입력 스트림 하나를 함께 구독 (재접속 시 장치를 다시 열지 않음)
         try:
-            with sd.InputStream(
-                callback=audio_callback,
-                channels=1,
-                samplerate=SAMPLE_RATE,
-                blocksize=BUFFER_SIZE,
-            ):
-                while not stop_event.is_set():
-                    await asyncio.sleep(WINDOW_TIME)
+            stream = open_source(AUDIO_SOURCE, SAMPLE_RATE, BUFFER_SIZE, channels=1)
+            await loop.run_in_executor(None, stream.subscribe, audio_callback)
         except Exception as e:
             print("Stream error:", e)
             stop_event.set()
+            return
+        try:
+            while not stop_event.is_set():
+                await asyncio.sleep(WINDOW_TIME)
+        finally:
+            stream.unsubscribe(audio_callback)
+
+    dsp_thread = threading.Thread(target=dsp_worker, daemon=True)
+    dsp_thread.start()
+    send_task = asyncio.create_task(send_loop())
 
     # ✅ audio stream은 백그라운드 Task로 실행
     audio_task = asyncio.create_task(audio_stream_loop())
@@ -69,4 +156,104 @@ async def websocket_endpoint(websocket: WebSocket):
     finally:
         stop_event.set()
         await audio_task  # audio 루프 종료 대기
-        print("Cleanup done.")
+        send_task.cancel()
+        dsp_stop.set()
+        chunk_ready.set()
+        await loop.run_in_executor(None, dsp_thread.join)
+        detector_pool.release(detector)
+        print(f"Cleanup done. (dropped blocks: {stats['dropped_blocks']}, "
+              f"input overflows: {stats['input_overflows']}, coalesced results: {latest.coalesced})")
+
+
+@chordprac_router.websocket("/ws/chordprac/stream")
+async def stream_endpoint(websocket: WebSocket):
+    """ 클라이언트가 보낸 PCM 바이너리 프레임으로 코드 감지 (서버 사운드카드 불필요)
+
+    연결 직후 첫 텍스트 메시지로 {"format": "int16" | "float32", "sample_rate": 44100}을 보내면
+    {"type": "ready", ...}로 응답하고, 이후 바이너리 프레임(리틀 엔디언, 모노)을 받는다.
+    """
+    await websocket.accept()
+
+    try:
+        config = await websocket.receive_json()
+        sample_format = config.get("format", "int16")
+        sample_rate = int(config.get("sample_rate", SAMPLE_RATE))
+    except WebSocketDisconnect:
+        return
+    except Exception:
+        await websocket.send_json({"type": "error", "message": "첫 메시지는 포맷/샘플레이트 JSON이어야 합니다."})
+        await websocket.close(code=1003)
+        return
+
+    if sample_format not in STREAM_FORMATS or not STREAM_SAMPLE_RATES[0] <= sample_rate <= STREAM_SAMPLE_RATES[1]:
+        await websocket.send_json({"type": "error", "message": f"지원하지 않는 포맷입니다: {sample_format} / {sample_rate}Hz"})
+        await websocket.close(code=1003)
+        return
+
+    dtype, scale = STREAM_FORMATS[sample_format]
+    block_bytes = BUFFER_SIZE * dtype.itemsize
+    await websocket.send_json({
+        "type": "ready",
+        "format": sample_format,
+        "sample_rate": sample_rate,
+        "block_size": BUFFER_SIZE,
+        "queue_size": STREAM_QUEUE_SIZE,
+    })
+
+    loop = asyncio.get_event_loop()
+    detector = detector_pool.acquire(sample_rate=sample_rate)
+    queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    stats = {"received_blocks": 0, "processed_blocks": 0, "dropped_blocks": 0}
+
+    async def process_loop():
+        while True:
+            audio = await queue.get()
+            if audio is None:
+                break
+            # DSP는 이벤트 루프 밖에서 실행
+            freqs, notes, chord = await loop.run_in_executor(None, detector.process, audio)
+            stats["processed_blocks"] += 1
+            result = build_result(freqs, notes, chord)
+            result["stream"] = dict(stats)
+            start = metrics.now()
+            await websocket.send_json(result)
+            SEND_TIME.observe_since(start)
+
+    process_task = asyncio.create_task(process_loop())
+    pending = bytearray()
+
+    try:
+        while not process_task.done():
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            data = message.get("bytes")
+            if not data:
+                continue  # 스트리밍 중 텍스트 메시지는 무시
+
+            # 블록 단위로 잘라서 큐에 넣고, 처리가 밀리면 가장 오래된 블록을 버림
+            pending.extend(data)
+            while len(pending) >= block_bytes:
+                audio = np.frombuffer(bytes(pending[:block_bytes]), dtype=dtype).astype(np.float64) * scale
+                del pending[:block_bytes]
+                stats["received_blocks"] += 1
+                if queue.full():
+                    queue.get_nowait()
+                    stats["dropped_blocks"] += 1
+                    STREAM_DROPS.inc()
+                queue.put_nowait(audio)
+    except WebSocketDisconnect:
+        print("Stream WebSocket disconnected by client.")
+    except Exception as e:
+        print("Stream receive loop error:", e)
+    finally:
+        if not process_task.done():
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+        try:
+            await process_task
+        except Exception as e:
+            print("Stream process loop error:", e)
+        detector_pool.release(detector)
+        print("Stream cleanup done.")
@@ -1,51 +1,135 @@
-from fastapi import APIRouter, UploadFile, File
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query
+from fastapi.responses import StreamingResponse
+import asyncio
+import io
+import json
+import logging
 import os
-import uuid
-from music21 import converter, interval, pitch
+import tempfile
+import zipfile
+import numpy as np
+import music21
+from music21 import converter
+from function.midi_reader import read_midi, parse_midi, MUSIC21_VERSION
+from function.feature_cache import feature_cache, content_key, is_valid_key
+from function.alignment import banded_dtw
+from function.process_pool import get_executor
+
+logger = logging.getLogger(__name__)
 
 compare_router = APIRouter()
 
-def normalize_pitches(notes, tolerance=1):
-    """음표 리스트를 MIDI 값으로 변환하여 오차 적용"""
-    normalized = []
-    for n in notes:
+# SMF 리더는 music21 내부 동작을 따라 한 것이라, 맞춰 둔 버전이 아니면 점수가 바뀌지 않도록 music21로만 읽음
+NATIVE_MIDI_READER = tuple(int(part) for part in music21.VERSION[:2]) == MUSIC21_VERSION
+if not NATIVE_MIDI_READER:
+    logger.warning("music21 %s is not the version the SMF reader follows (%s); using music21 for all MIDI files",
+                   music21.__version__, ".".join(map(str, MUSIC21_VERSION)))
+
+MIDI_EXTENSIONS = (".mid", ".midi")
+
+class MidiFeatures:
+    """ 비교에 쓰는 특징을 한 번의 파싱으로 모은 것
+
+    pitches: 단음(Note)의 MIDI 음높이, rhythms: 모든 음(화음 포함)의 길이(quarterLength),
+    intervals: 연속한 단음 사이의 반음 수 (모두 오차 적용 전 원래 값의 NumPy 배열)
+    """
+
+    __slots__ = ("pitches", "rhythms", "intervals")
+
+    def __init__(self, pitches, rhythms, intervals):
+        self.pitches = pitches
+        self.rhythms = rhythms
+        self.intervals = intervals
+
+    def arrays(self):
+        """ 캐시에 저장할 배열 dict (MidiFeatures(**arrays)로 되돌림) """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def normalized_pitches(self, tolerance=2):
+        return np.round(self.pitches / tolerance) * tolerance
+
+    def normalized_rhythms(self, tolerance=0.3):
+        return np.round(self.rhythms / tolerance) * tolerance
+
+    def normalized_intervals(self, tolerance=3):
+        return np.round(self.intervals / tolerance) * tolerance
+
+def extract_features(midi_path):
+    """MIDI 파일에서 음높이/리듬/음정 특징을 함께 추출 (SMF를 바로 읽고, 그 리더가 못 맞추는 파일만 music21로)"""
+    if not NATIVE_MIDI_READER:
+        return extract_features_music21(midi_path)
+    try:
+        notes = read_midi(midi_path)
+    except ValueError:
+        return extract_features_music21(midi_path)
+    return features_from_notes(notes)
+
+def extract_features_from_bytes(data):
+    """업로드된 MIDI 내용에서 특징 추출 (music21로 읽어야 할 때만 임시 파일을 씀)"""
+    try:
+        if not NATIVE_MIDI_READER:
+            raise ValueError("music21 버전이 달라 SMF 리더를 쓰지 않음")
+        notes = parse_midi(data)
+    except ValueError:
+        fd, path = tempfile.mkstemp(suffix=".mid")
         try:
-            midi_value = pitch.Pitch(n).midi
-            normalized.append(round(midi_value / tolerance) * tolerance)
-        except:
-            normalized.append(n)
-    return normalized
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            return extract_features_music21(path)
+        finally:
+            os.remove(path)
+    return features_from_notes(notes)
 
-def extract_notes(midi_path, tolerance=2):
-    """MIDI 파일에서 음표(Pitch) 목록을 추출 (오차 적용)"""
+def features_from_notes(notes):
+    pitches = notes.pitches[notes.single_notes].astype(float)
+    return MidiFeatures(pitches, notes.durations, np.diff(pitches))
+
+def cached_features(data, key=None):
+    """내용 해시로 캐시를 먼저 보고, 없을 때만 파싱해서 캐시에 넣음"""
+    key = key or content_key(data)
+    arrays = feature_cache.get(key)
+    if arrays is not None:
+        return MidiFeatures(**arrays)
+    features = extract_features_from_bytes(data)
+    feature_cache.put(key, features.arrays())
+    return features
+
+def reference_features(reference_id):
+    """등록된 기준곡의 특징 (캐시에서 빠졌으면 보관해 둔 원본에서 다시 추출, 등록되지 않았으면 None)"""
+    # 캐시 키는 업로드한 어떤 파일이든 생기므로, 기준곡으로 등록된(원본이 보관된) ID만 받음
+    if not is_valid_key(reference_id) or not os.path.exists(feature_cache.reference_path(reference_id)):
+        return None
+    arrays = feature_cache.get(reference_id)
+    if arrays is not None:
+        return MidiFeatures(**arrays)
+    data = feature_cache.load_reference(reference_id)
+    if data is None:
+        return None
+    return cached_features(data, reference_id)
+
+def extract_features_music21(midi_path):
+    """MIDI 파일을 music21로 한 번만 파싱하고 flat 음표를 한 번만 돌면서 특징을 추출"""
     midi = converter.parse(midi_path)
-    notes = []
-    for element in midi.flat.notes:
+    pitches = []
+    rhythms = []
+    for element in midi.flatten().notes:
+        rhythms.append(float(element.duration.quarterLength))
         if element.isNote:
-            notes.append(str(element.pitch))
-    return normalize_pitches(notes, tolerance)
+            pitches.append(element.pitch.ps)
+    pitches = np.array(pitches, dtype=float)
+    return MidiFeatures(np.round(pitches), np.array(rhythms, dtype=float), np.diff(pitches))
+
+def extract_notes(midi_path, tolerance=2):
+    """MIDI 파일에서 음표(Pitch) 목록을 추출 (오차 적용)"""
+    return extract_features(midi_path).normalized_pitches(tolerance).tolist()
 
 def extract_rhythms(midi_path, tolerance=0.3):
     """MIDI 파일에서 리듬(Duration) 목록을 추출 (오차 적용)"""
-    midi = converter.parse(midi_path)
-    rhythms = [n.duration.quarterLength for n in midi.flat.notes]
-    return [round(rhythm / tolerance) * tolerance for rhythm in rhythms]
+    return extract_features(midi_path).normalized_rhythms(tolerance).tolist()
 
 def extract_intervals(midi_path, tolerance=3):
     """MIDI 파일에서 멜로디 패턴(Interval) 목록을 추출 (오차 적용)"""
-    midi = converter.parse(midi_path)
-    notes = [n.pitch for n in midi.flat.notes if n.isNote]
-
-    raw_intervals = []
-    for i in range(len(notes) - 1):
-        try:
-            iv = interval.Interval(notes[i], notes[i + 1])
-            raw_intervals.append(iv.semitones)
-        except:
-            continue
-
-    normalized_intervals = [round(i / tolerance) * tolerance for i in raw_intervals]
-    return normalized_intervals
+    return extract_features(midi_path).normalized_intervals(tolerance).tolist()
 
 def calculate_penalty_score(list1, list2, tolerance):
     """100점 시작 후, tolerance 밖일 때마다 1점 감점"""
@@ -66,40 +150,171 @@ def calculate_penalty_score(list1, list2, tolerance):
 
     return score / 100.0  # 0~1로 변환해서 반환
 
+def calculate_alignment_score(list1, list2, tolerance, band=None):
+    """DTW 정합 경로를 따라 tolerance 밖인 칸마다 1점 감점 → (점수, 정합 결과)
+
+    음을 더 치거나 빼먹어도 그 뒤가 밀리지 않는다. 정합 결과의 pairs는 [list1 위치, list2 위치],
+    mismatch는 그 쌍이 tolerance 밖인지 (화면에서 틀린 음 표시용).
+    """
+    if min(len(list1), len(list2)) == 0:
+        return 0.0, {"pairs": [], "mismatch": []}
+    mismatches, path, mismatch = banded_dtw(list1, list2, tolerance, band)
+    score = max(100.0 - mismatches, 0.0) / 100.0
+    return score, {"pairs": path.tolist(), "mismatch": mismatch.tolist()}
+
 def compare_midi_files_with_penalty(midi1_path, midi2_path):
-    """MIDI 파일 비교"""
-    notes1, notes2 = extract_notes(midi1_path), extract_notes(midi2_path)
-    rhythms1, rhythms2 = extract_rhythms(midi1_path), extract_rhythms(midi2_path)
-    intervals1, intervals2 = extract_intervals(midi1_path), extract_intervals(midi2_path)
-
-    pitch_similarity = calculate_penalty_score(notes1, notes2, tolerance=2)
-    rhythm_similarity = calculate_penalty_score(rhythms1, rhythms2, tolerance=0.5)
-    interval_similarity = calculate_penalty_score(intervals1, intervals2, tolerance=2)
-
-    final_similarity = (pitch_similarity * 0.4) + (rhythm_similarity * 0.55) + (interval_similarity * 0.05)
-
-    return {
-        "pitch_similarity": round(pitch_similarity, 3),
-        "rhythm_similarity": round(rhythm_similarity, 3),
-        "interval_similarity": round(interval_similarity, 3),
-        "final_similarity": round(final_similarity, 3)
+    """MIDI 파일 비교 (파일마다 한 번만 파싱)"""
+    return compare_features_with_penalty(extract_features(midi1_path), extract_features(midi2_path))
+
+# 점수 항목: (이름, 특징 정규화, 정규화 단위, 비교 허용 오차, 최종 점수 가중치). penalty/dtw 방식이 함께 씀
+SIMILARITY_PARTS = (
+    ("pitch", MidiFeatures.normalized_pitches, 2, 2, 0.4),
+    ("rhythm", MidiFeatures.normalized_rhythms, 0.3, 0.5, 0.55),
+    ("interval", MidiFeatures.normalized_intervals, 3, 2, 0.05),
+)
+
+def similarity_result(similarities):
+    """{항목 이름: 0~1 점수} → 응답 dict (항목별 점수와 가중치로 합산한 final_similarity)"""
+    result = {}
+    final_similarity = 0.0
+    for name, _, _, _, weight in SIMILARITY_PARTS:
+        result[f"{name}_similarity"] = round(similarities[name], 3)
+        final_similarity += similarities[name] * weight
+    result["final_similarity"] = round(final_similarity, 3)
+    return result
+
+def compare_features_with_penalty(features1, features2):
+    """추출해 둔 특징끼리 비교"""
+    return similarity_result({
+        name: calculate_penalty_score(normalize(features1, unit), normalize(features2, unit), tolerance)
+        for name, normalize, unit, tolerance, _ in SIMILARITY_PARTS
+    })
+
+def compare_features_with_alignment(features1, features2, band=None):
+    """추출해 둔 특징끼리 DTW 정합으로 비교 (점수 항목과 가중치는 penalty 방식과 같음)
+
+    alignment의 pitch/interval 위치는 단음 기준, rhythm 위치는 화음을 포함한 전체 음 기준이다.
+    """
+    scores = {
+        name: calculate_alignment_score(normalize(features1, unit), normalize(features2, unit), tolerance, band)
+        for name, normalize, unit, tolerance, _ in SIMILARITY_PARTS
     }
+    result = similarity_result({name: similarity for name, (similarity, _) in scores.items()})
+    result["alignment"] = {name: alignment for name, (_, alignment) in scores.items()}
+    return result
 
-@compare_router.post("/compare/")
-async def compare_midi_files(file1: UploadFile = File(...), file2: UploadFile = File(...)):
-    # UUID 사용해서 파일명 충돌 방지
-    file1_path = f"temp_{uuid.uuid4()}_{file1.filename}"
-    file2_path = f"temp_{uuid.uuid4()}_{file2.filename}"
+SCORING_MODES = {
+    "penalty": compare_features_with_penalty,  # 기존 방식: 같은 순번끼리 비교
+    "dtw": compare_features_with_alignment,
+}
+
+def scoring_function(mode):
+    if mode not in SCORING_MODES:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 비교 방식: {mode} (penalty, dtw 중 선택)")
+    return SCORING_MODES[mode]
 
-    with open(file1_path, "wb") as f:
-        f.write(await file1.read())
+def compare_features(features1, features2, mode="penalty"):
+    return scoring_function(mode)(features1, features2)
+
+def features_or_400(data, key=None):
+    try:
+        return cached_features(data, key)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"MIDI 파일을 읽을 수 없습니다: {str(e)}")
+
+def compare_contents(data1, data2, mode):
+    """업로드된 MIDI 두 개 비교 (같은 기준곡이 반복해서 올라오므로 내용 해시로 캐시된 특징을 먼저 찾음)"""
+    return compare_features(features_or_400(data1), features_or_400(data2), mode)
+
+def compare_upload(reference, data, mode):
+    """등록된 기준곡과 업로드된 MIDI 하나 비교"""
+    return compare_features(reference, features_or_400(data), mode)
+
+def score_attempt(reference_arrays, data, mode):
+    """시도 파일 하나의 특징을 추출해 기준곡과 비교 (프로세스 풀로도 넘길 수 있게 기준곡은 배열 dict로 받음)"""
+    return compare_features(MidiFeatures(**reference_arrays), cached_features(data), mode)
+
+async def read_attempts(files):
+    """업로드된 시도 파일들 → [(이름, 내용)] (zip은 안의 MIDI 파일들로 펼침)"""
+    attempts = []
+    for file in files:
+        data = await file.read()
+        if not zipfile.is_zipfile(io.BytesIO(data)):
+            attempts.append((file.filename, data))
+            continue
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            for info in archive.infolist():
+                name = info.filename
+                if info.is_dir() or name.startswith("__MACOSX/") or not name.lower().endswith(MIDI_EXTENSIONS):
+                    continue
+                attempts.append((name, archive.read(info)))
+    return attempts
+
+async def stream_batch(reference, attempts, mode):
+    """ 시도 파일을 모두 풀에 넣고, 끝나는 순서대로 NDJSON 줄을 내보냄 (index는 업로드 순서) """
+    loop = asyncio.get_event_loop()
+    pool = get_executor()
+    reference_arrays = reference.arrays()
+
+    async def run(index, name, data):
+        try:
+            result = await loop.run_in_executor(pool, score_attempt, reference_arrays, data, mode)
+        except Exception as e:
+            return {"index": index, "name": name, "error": str(e)}
+        return {"index": index, "name": name, **result}
+
+    tasks = [asyncio.ensure_future(run(index, name, data)) for index, (name, data) in enumerate(attempts)]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield json.dumps(await task, ensure_ascii=False) + "\n"
+        yield json.dumps({"done": True, "attempts": len(tasks)}) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+@compare_router.post("/compare/")
+async def compare_midi_files(file1: UploadFile = File(...), file2: UploadFile = File(...),
+                             mode: str = Query("penalty")):
+    scoring_function(mode)
+    data1, data2 = await file1.read(), await file2.read()
+    # 파싱/채점은 CPU를 오래 쓰므로 이벤트 루프 밖 스레드에서 실행
+    return await asyncio.get_event_loop().run_in_executor(None, compare_contents, data1, data2, mode)
 
-    with open(file2_path, "wb") as f:
-        f.write(await file2.read())
+@compare_router.post("/compare/references/")
+async def register_reference(file: UploadFile = File(...)):
+    # 기준곡을 한 번 등록해 두고 이후에는 ID로 비교
+    data = await file.read()
+    reference_id = content_key(data)
+    features = await asyncio.get_event_loop().run_in_executor(None, features_or_400, data, reference_id)
+    feature_cache.save_reference(reference_id, data)
+    return {"reference_id": reference_id, "notes": len(features.rhythms)}
 
-    similarity_result = compare_midi_files_with_penalty(file1_path, file2_path)
+@compare_router.post("/compare/references/{reference_id}")
+async def compare_with_reference(reference_id: str, file: UploadFile = File(...), mode: str = Query("penalty")):
+    scoring_function(mode)
+    data = await file.read()
+    loop = asyncio.get_event_loop()
+    reference = await loop.run_in_executor(None, reference_features, reference_id)
+    if reference is None:
+        raise HTTPException(status_code=404, detail="등록된 기준곡을 찾을 수 없습니다.")
+    return await loop.run_in_executor(None, compare_upload, reference, data, mode)
 
-    os.remove(file1_path)
-    os.remove(file2_path)
+# 🟢 기준곡 하나(업로드 또는 등록 ID)와 여러 시도(MIDI 여러 개 또는 zip)를 한 번에 비교
+@compare_router.post("/compare/batch/")
+async def compare_batch(attempts: list[UploadFile] = File(...), reference: UploadFile = File(None),
+                        reference_id: str = Form(None), mode: str = Query("penalty")):
+    scoring_function(mode)
+    loop = asyncio.get_event_loop()
+    if reference is not None:
+        features = await loop.run_in_executor(None, features_or_400, await reference.read())
+    elif reference_id:
+        features = await loop.run_in_executor(None, reference_features, reference_id)
+        if features is None:
+            raise HTTPException(status_code=404, detail="등록된 기준곡을 찾을 수 없습니다.")
+    else:
+        raise HTTPException(status_code=400, detail="기준곡 파일(reference)이나 등록 ID(reference_id)가 필요합니다.")
 
-    return similarity_result
+    attempt_files = await read_attempts(attempts)
+    if not attempt_files:
+        raise HTTPException(status_code=400, detail="비교할 MIDI 파일이 없습니다.")
+    return StreamingResponse(stream_batch(features, attempt_files, mode), media_type="application/x-ndjson")
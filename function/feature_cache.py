@@ -0,0 +1,157 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+from monitoring import metrics
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.getenv("MIDI_FEATURE_CACHE_DIR", os.path.join(BASE_DIR, "..", "cache", "midi_features"))
+MEMORY_BYTES = int(os.getenv("MIDI_FEATURE_CACHE_MEMORY_BYTES", 64 * 1024 * 1024))
+DISK_BYTES = int(os.getenv("MIDI_FEATURE_CACHE_DISK_BYTES", 512 * 1024 * 1024))
+
+# 특징 추출 방식이 바뀌면 올려서 이전 디스크 캐시를 쓰지 않게 함 (등록된 기준곡은 원본에서 다시 추출)
+FEATURE_VERSION = 1
+
+KEY_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+def content_key(data):
+    """ MIDI 파일 내용의 SHA-256 (캐시 키이자 기준곡 ID) """
+    return hashlib.sha256(data).hexdigest()
+
+def is_valid_key(key):
+    return bool(KEY_PATTERN.fullmatch(key))
+
+def lookups(tier, result):
+    return metrics.registry.usage_counter("midi_feature_cache_lookups_total", "MIDI feature cache lookups by tier",
+                                          tier=tier, result=result)
+
+MEMORY_HITS, MEMORY_MISSES = lookups("memory", "hit"), lookups("memory", "miss")
+DISK_HITS, DISK_MISSES = lookups("disk", "hit"), lookups("disk", "miss")
+EVICTIONS = {
+    tier: metrics.registry.usage_counter("midi_feature_cache_evictions_total",
+                                         "Entries evicted to stay under the size limit", tier=tier)
+    for tier in ("memory", "disk")
+}
+
+class FeatureCache:
+    """ 내용 해시 → 특징 배열 dict 캐시 (메모리 LRU + 디스크 .npz)
+
+    두 계층 모두 바이트 크기 상한을 넘으면 가장 오래 쓰이지 않은 항목부터 지운다.
+    디스크 계층은 파일 수정 시각을 마지막 사용 시각으로 쓰므로 서버를 다시 띄워도, 여러 워커가 함께 써도 유지된다.
+    references/ 아래의 기준곡 원본은 지우지 않는다.
+    """
+
+    def __init__(self, directory=CACHE_DIR, memory_bytes=MEMORY_BYTES, disk_bytes=DISK_BYTES):
+        self.directory = os.path.join(directory, f"v{FEATURE_VERSION}")
+        self.reference_dir = os.path.join(directory, "references")
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.memory = OrderedDict()  # key -> (arrays, nbytes)
+        self.memory_used = 0
+        self.disk_used = None  # 첫 쓰기 때 디렉터리를 훑어 계산
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """ 캐시된 특징 배열 dict (없으면 None) """
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+                MEMORY_HITS.inc()
+                return entry[0]
+        MEMORY_MISSES.inc()
+
+        path = self.path(key)
+        try:
+            with np.load(path) as stored:
+                arrays = {name: stored[name] for name in stored.files}
+            os.utime(path)
+        except (OSError, ValueError):
+            DISK_MISSES.inc()
+            return None
+        DISK_HITS.inc()
+        self.remember(key, arrays)
+        return arrays
+
+    def put(self, key, arrays):
+        self.remember(key, arrays)
+        os.makedirs(self.directory, exist_ok=True)
+        # 다른 워커가 읽다 만 파일을 보지 않도록 임시 파일에 쓴 뒤 바꿔 넣음
+        path = self.path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(f, **arrays)
+        size = os.path.getsize(temp_path)
+        os.replace(temp_path, path)
+        with self.lock:
+            if self.disk_used is None:
+                self.disk_used = sum(size for _, size in self.disk_entries())
+            else:
+                self.disk_used += size
+            if self.disk_used > self.disk_bytes:
+                self.evict_disk()
+
+    def remember(self, key, arrays):
+        nbytes = sum(array.nbytes for array in arrays.values())
+        with self.lock:
+            if key in self.memory:
+                self.memory_used -= self.memory.pop(key)[1]
+            self.memory[key] = (arrays, nbytes)
+            self.memory_used += nbytes
+            while self.memory_used > self.memory_bytes and len(self.memory) > 1:
+                _, (_, evicted) = self.memory.popitem(last=False)
+                self.memory_used -= evicted
+                EVICTIONS["memory"].inc()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def disk_entries(self):
+        """ [(경로, 크기)] 오래 쓰이지 않은 순 """
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(".npz"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.path, stat.st_size))
+        entries.sort()
+        return [(path, size) for _, path, size in entries]
+
+    def evict_disk(self):
+        # 다른 워커가 쓴 파일도 있으므로 실제 디렉터리 기준으로 다시 계산
+        entries = self.disk_entries()
+        self.disk_used = sum(size for _, size in entries)
+        for path, size in entries[:-1]:
+            if self.disk_used <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.disk_used -= size
+            EVICTIONS["disk"].inc()
+
+    def save_reference(self, key, data):
+        """ 기준곡 원본 MIDI 보관 (특징 캐시가 지워지거나 버전이 바뀌어도 다시 추출할 수 있게) """
+        os.makedirs(self.reference_dir, exist_ok=True)
+        path = self.reference_path(key)
+        if not os.path.exists(path):
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+
+    def load_reference(self, key):
+        """ 등록된 기준곡 원본 (없으면 None) """
+        try:
+            with open(self.reference_path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def reference_path(self, key):
+        return os.path.join(self.reference_dir, f"{key}.mid")
+
+feature_cache = FeatureCache()
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from monitoring import metrics
+
+metrics_router = APIRouter()
+
+# 🟢 DSP 단계별 지연 시간 / 프레임 드롭 지표 (Prometheus 텍스트 포맷, DSP_METRICS=1 일 때 수집)와 항상 세는 MIDI 특징 캐시 지표
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,410 @@
+""" music21 없이 SMF(표준 MIDI 파일)를 바로 읽어 비교용 음표 배열을 만드는 가벼운 리더
+
+converter.parse()가 하는 일 중 비교 특징(음높이/길이/순서)에 영향을 주는 부분만 NumPy로 옮겼다:
+note on/off 짝짓기, 함께 시작하고 끝나는 음을 화음으로 묶기, (4, 3) 분할 양자화, 마디선에서 붙임줄로 나누기.
+SMPTE 시간 단위나 알 수 없는 이벤트, 성부로 나뉜 마디에 걸친 붙임줄처럼 music21의 결과를 그대로 맞추기 어려운 파일은
+ValueError를 내고, 호출하는 쪽이 music21로 대신 읽는다.
+"""
+import numpy as np
+
+# 이 리더가 결과를 맞춘 music21 버전 (major, minor). 다른 버전이 설치돼 있으면 compare.py는 music21로만 읽는다.
+MUSIC21_VERSION = (10, 5)
+
+UNITS_PER_QUARTER = 96  # 양자화 격자(1/4, 1/3)와 64분음표 박자표의 마디 길이를 정수로 다루는 단위
+QUANTIZE_DIVISORS = (4, 3)  # music21 기본 양자화 (16분음표, 8분음표 셋잇단)
+DRUM_CHANNEL = 9  # 10번 채널 (타악기)
+
+# music21 파트에 요소로 들어가는 메타 이벤트: 트랙 이름, 악기 이름, 템포, 박자표, 조표
+ELEMENT_META_TYPES = (0x03, 0x04, 0x51, 0x58, 0x59)
+CONDUCTOR_META_TYPES = (0x51, 0x58, 0x59)  # 음 없는 트랙에서 모든 파트로 복사되는 템포, 박자표, 조표
+TIME_SIGNATURE = 0x58
+MAX_BARS = 100000  # 악보로 말이 안 되게 긴 파일(잘못된 델타 시간 등)은 배열을 만들기 전에 거절
+
+class MidiNotes:
+    """ music21 flatten().notes와 같은 순서의 음/화음 배열
+
+    onsets, durations: quarterLength, pitches: MIDI 음높이 (화음은 첫 음), velocities: 세기,
+    chords: 화음 여부, drums: 10번 채널(타악기) 여부. 마디선을 넘는 음은 붙임줄로 나뉜 조각마다 한 항목이다.
+    """
+
+    __slots__ = ("onsets", "durations", "pitches", "velocities", "chords", "drums")
+
+    def __init__(self, onsets, durations, pitches, velocities, chords, drums):
+        self.onsets = onsets
+        self.durations = durations
+        self.pitches = pitches
+        self.velocities = velocities
+        self.chords = chords
+        self.drums = drums
+
+    def __len__(self):
+        return len(self.onsets)
+
+    @property
+    def single_notes(self):
+        """ 음높이가 있는 단음(music21 Note) 위치 """
+        return ~(self.chords | self.drums)
+
+def read_midi(path):
+    with open(path, "rb") as f:
+        return parse_midi(f.read())
+
+def parse_midi(data):
+    """ SMF 바이트 → MidiNotes """
+    if data[:4] != b"MThd" or len(data) < 14 or int.from_bytes(data[4:8], "big") != 6:
+        raise ValueError("MIDI 파일 헤더(MThd)가 올바르지 않습니다.")
+    file_format = int.from_bytes(data[8:10], "big")
+    track_count = int.from_bytes(data[10:12], "big")
+    division = int.from_bytes(data[12:14], "big")
+    if file_format not in (0, 1):
+        raise ValueError(f"지원하지 않는 MIDI 형식: {file_format}")
+    if division & 0x8000:
+        raise ValueError("SMPTE 시간 단위 MIDI 파일은 지원하지 않습니다.")
+    if division == 0:
+        raise ValueError("MIDI 파일의 시간 단위(division)가 0입니다.")
+    if track_count == 0:
+        raise ValueError("MIDI 파일에 트랙이 없습니다.")
+    ticks_per_quarter = division
+
+    tracks = []
+    position = 14
+    for _ in range(track_count):
+        if data[position:position + 4] != b"MTrk":
+            raise ValueError("MIDI 트랙(MTrk)이 올바르지 않습니다.")
+        length = int.from_bytes(data[position + 4:position + 8], "big")
+        tracks.append(read_track(data[position + 8:position + 8 + length]))
+        position += 8 + length
+
+    # 음이 없는 트랙(보통 0번)의 박자표/템포/조표는 뒤에 오는 모든 파트에 들어간다
+    conductor_signatures = []
+    conductor_ticks = []
+    parts = []
+    for notes, signatures, element_ticks, track_conductor_ticks in tracks:
+        if notes[1].any():
+            parts.append(build_part(notes, signatures, element_ticks, conductor_signatures, conductor_ticks,
+                                    ticks_per_quarter))
+        else:
+            conductor_signatures.extend(signatures)
+            conductor_ticks.extend(track_conductor_ticks)
+
+    if not parts:
+        empty = np.zeros(0)
+        return MidiNotes(empty, empty, empty.astype(int), empty.astype(int), empty.astype(bool), empty.astype(bool))
+
+    # flatten() 순서: 시작 위치, 꾸밈음 먼저, 파트 순서, 파트 안에서는 원래 순서 (마디를 넘어온 조각은 그 뒤)
+    columns = [np.concatenate(column) for column in zip(*parts)]
+    onsets, durations, pitches, velocities, chords, drums, graces, continued, parent_onsets, parent_continued, order = columns
+    part_index = np.concatenate([np.full(len(part[0]), index) for index, part in enumerate(parts)])
+    sort = np.lexsort((order, parent_continued, parent_onsets, continued, part_index, ~graces, onsets))
+    return MidiNotes(onsets[sort] / UNITS_PER_QUARTER, durations[sort] / UNITS_PER_QUARTER, pitches[sort],
+                     velocities[sort], chords[sort], drums[sort])
+
+def read_variable_length(data, position):
+    value = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value = (value << 7) | (byte & 0x7F)
+        if byte < 0x80:
+            return value, position
+
+def read_track(data):
+    """ 트랙 바이트 → (note 이벤트 배열들, 박자표 [(틱, 분자, 분모 지수)], music21 요소가 되는 이벤트 틱 목록,
+    그중 템포/박자표/조표 틱 목록)
+
+    note 이벤트 배열은 (틱, note on 여부, 음높이, 채널, 세기)이며 파일 순서 그대로다. 세기 0인 note on은 note off.
+    """
+    ticks, ons, pitches, channels, velocities = [], [], [], [], []
+    signatures = []
+    element_ticks = []
+    conductor_ticks = []
+    tick = 0
+    position = 0
+    running_status = None
+    end = len(data)
+    try:
+        while position < end:
+            delta, position = read_variable_length(data, position)
+            tick += delta
+            if end - position < 2:
+                break
+            status = data[position]
+            if status < 0x80:
+                # running status: 데이터 바이트부터 시작 (music21처럼 앞선 상태가 없으면 note on)
+                status = running_status if running_status is not None else 0x90
+            else:
+                position += 1
+                if status != 0xFF:
+                    running_status = status
+
+            kind = status & 0xF0
+            if kind == 0x80 or kind == 0x90:
+                pitch, velocity = data[position], data[position + 1]
+                position += 2
+                ticks.append(tick)
+                ons.append(kind == 0x90 and velocity != 0)
+                pitches.append(pitch)
+                channels.append(status & 0x0F)
+                velocities.append(velocity)
+            elif kind == 0xC0:
+                # 프로그램 변경은 music21에서 악기 요소가 됨
+                element_ticks.append(tick)
+                position += 1
+            elif kind == 0xD0:
+                position += 1
+            elif kind in (0xA0, 0xB0, 0xE0):
+                position += 2
+            elif status in (0xF0, 0xF7):
+                length, position = read_variable_length(data, position)
+                position += length
+            elif status == 0xFF:
+                meta_type = data[position]
+                length, position = read_variable_length(data, position + 1)
+                if meta_type in ELEMENT_META_TYPES:
+                    element_ticks.append(tick)
+                    if meta_type in CONDUCTOR_META_TYPES:
+                        conductor_ticks.append(tick)
+                    if meta_type == TIME_SIGNATURE:
+                        signatures.append((tick, data[position], data[position + 1]))
+                position += length
+            else:
+                raise ValueError(f"알 수 없는 MIDI 이벤트: {status:#x}")
+    except IndexError:
+        raise ValueError("MIDI 트랙 데이터가 잘려 있습니다.")
+
+    notes = (
+        np.array(ticks, dtype=np.int64),
+        np.array(ons, dtype=bool),
+        np.array(pitches, dtype=np.int64),
+        np.array(channels, dtype=np.int64),
+        np.array(velocities, dtype=np.int64),
+    )
+    return notes, signatures, element_ticks, conductor_ticks
+
+def pair_notes(ticks, ons, pitches, channels):
+    """ note on마다 같은 음높이/채널의 다음 note off를 찾음 (music21처럼 off 하나를 여러 on이 함께 쓸 수 있음)
+
+    짝이 없는 note on은 버린다. 반환: (note on 위치, note off 틱)
+    """
+    count = len(ticks)
+    keys = pitches * 16 + channels
+    on_index = np.flatnonzero(ons)
+    off_index = np.flatnonzero(~ons)
+    off_codes = np.sort(keys[off_index] * count + off_index)
+    found = np.searchsorted(off_codes, keys[on_index] * count + on_index)
+    valid = found < len(off_codes)
+    valid[valid] = off_codes[found[valid]] // count == keys[on_index[valid]]
+    on_index = on_index[valid]
+    off_ticks = ticks[off_codes[found[valid]] % count]
+    return on_index, off_ticks
+
+def group_chords(starts, ends, drums, tolerance):
+    """ music21 midiTrackToStream의 화음 묶기
+
+    앞선 음과 시작이 tolerance 안이고 끝도 tolerance 안인 음은 그 음의 화음에 들어간다.
+    화음은 묶인 음 중 하나라도 타악기면 타악기다 (drums를 그 자리에서 고침).
+    시작은 가깝지만 끝이 먼 음이 있으면 music21은 마디마다 성부(Voice)를 나눈다.
+    반환: (화음/단음의 첫 음 여부, 마지막으로 묶인 음 위치, 묶인 음 수, 성부가 필요한지)
+    """
+    count = len(starts)
+    heads = np.ones(count, dtype=bool)
+    last = np.arange(count)
+    sizes = np.ones(count, dtype=np.int64)
+    voices_required = False
+    window_ends = np.searchsorted(starts, starts + tolerance, side="left")
+    # 뒤에 가까운 음이 있는 경우만 파이썬으로 확인
+    for i in np.flatnonzero(window_ends > last + 1):
+        if not heads[i]:
+            continue
+        end = ends[i]
+        for j in range(i + 1, window_ends[i]):
+            if abs(ends[j] - end) <= tolerance:
+                heads[j] = False
+                last[i] = j
+                sizes[i] += 1
+                drums[i] |= drums[j]
+            else:
+                voices_required = True
+    return heads, last, sizes, voices_required
+
+def nearest_multiples(values, unit):
+    """ music21 common.nearestMultiple (반올림 경계는 아래쪽) → (값, 배수, 오차) """
+    multiples = np.floor(values / unit)
+    low = unit * multiples
+    high = unit * (multiples + 1)
+    use_low = values <= low + unit / 2
+    matches = np.where(use_low, low, high)
+    errors = np.round(np.where(use_low, values - low, high - values), 7)
+    return matches, np.where(use_low, multiples, multiples + 1), errors
+
+def quantize_offsets(values):
+    """ 시작 위치 양자화: 오차가 작은 격자, 같으면 더 촘촘한 격자 → 단위(UNITS_PER_QUARTER) 정수 """
+    best_units, best_errors, best_tick = None, None, None
+    for divisor in QUANTIZE_DIVISORS:
+        _, multiples, errors = nearest_multiples(values, 1 / divisor)
+        units = multiples.astype(np.int64) * (UNITS_PER_QUARTER // divisor)
+        if best_units is None:
+            best_units, best_errors, best_tick = units, errors, 1 / divisor
+            continue
+        better = (errors < best_errors) | ((errors == best_errors) & (1 / divisor < best_tick))
+        best_units = np.where(better, units, best_units)
+        best_errors = np.where(better, errors, best_errors)
+    return best_units
+
+def quantize_durations(values, gaps, zero_allowed):
+    """ 길이 양자화 (music21 Stream.quantize의 look-ahead 규칙)
+
+    다음 요소까지의 간격(gaps, quarterLength)을 격자로 나눌 수 없으면 간격을 덜 채우는 후보를 피하고,
+    그다음 오차, 격자 크기 순으로 고른다. 꾸밈음이 아니면 0이 되지 않는다.
+    """
+    candidates = []
+    for divisor in QUANTIZE_DIVISORS:
+        tick = 1 / divisor
+        matches, multiples, errors = nearest_multiples(values, tick)
+        zero = (matches == 0) & ~zero_allowed
+        matches = np.where(zero, tick, matches)
+        multiples = np.where(zero, 1, multiples)
+        errors = np.where(zero, np.abs(np.round(values - tick, 7)), errors)
+        remaining = np.where(gaps % tick == 0, 0.0, np.maximum(gaps - matches, 0.0))
+        units = multiples.astype(np.int64) * (UNITS_PER_QUARTER // divisor)
+        candidates.append((remaining, errors, tick, units))
+
+    remaining, errors, tick, units = candidates[0]
+    for other_remaining, other_errors, other_tick, other_units in candidates[1:]:
+        better = (other_remaining < remaining) | ((other_remaining == remaining) & (
+            (other_errors < errors) | ((other_errors == errors) & (other_tick < tick))))
+        remaining = np.where(better, other_remaining, remaining)
+        errors = np.where(better, other_errors, errors)
+        units = np.where(better, other_units, units)
+    return units
+
+def bar_lines(signatures, end):
+    """ 박자표 [(시작 단위, 마디 길이 단위)]로 end까지의 마디 시작 위치 (music21 makeMeasures와 같이 각 마디 시작 시점의 박자표 사용) """
+    offsets = [offset for offset, _ in signatures] + [np.inf]
+    segments = []
+    start, count = 0, 0
+    while True:
+        # start 시점의 박자표가 다음 박자표 전까지 (또는 end를 넘을 때까지) 같은 길이로 이어짐
+        index = int(np.searchsorted(offsets, start, side="right")) - 1
+        length = signatures[index][1]
+        limit = min(offsets[index + 1], end)
+        bars = max(-(-(limit - start) // length), 1) if start < end else 1
+        count += bars
+        if count > MAX_BARS:
+            raise ValueError(f"마디가 너무 많은 MIDI 파일입니다 ({MAX_BARS}마디 초과).")
+        segments.append(start + length * np.arange(bars, dtype=np.int64))
+        start = int(segments[-1][-1]) + length
+        if segments[-1][-1] >= end:
+            break
+    return np.concatenate(segments)
+
+def signature_units(signatures, ticks_per_quarter):
+    """ [(틱, 분자, 분모 지수)] → 양자화한 [(시작 단위, 마디 길이 단위)] (같은 위치는 나중 것) """
+    if not signatures:
+        return []
+    ticks = np.array([tick for tick, _, _ in signatures], dtype=float)
+    offsets = quantize_offsets(ticks / ticks_per_quarter)
+    result = {}
+    for offset, (_, numerator, power) in zip(offsets.tolist(), signatures):
+        if power > 6 or numerator == 0:
+            raise ValueError(f"지원하지 않는 박자표: {numerator}/{2 ** power}")
+        result[offset] = numerator * 4 * UNITS_PER_QUARTER // 2 ** power
+    return sorted(result.items())
+
+def has_stale_measures(onsets, ends, crossing, bars, meta_onsets):
+    """ music21이 마디 길이 캐시를 갱신하지 않아 뒤 마디들이 밀리는 파트인지
+
+    마디선을 넘는 화음을 나눠도 화음 쪽에서는 캐시를 지우지 않는데, 파트의 마지막 시점이 마디선이고
+    거기에 길이 0인 요소가 있으면 (storeAtEnd) 그 전에 캐시가 채워져, 화음이 시작한 마디의 길이가 나누기 전 끝까지로 남는다.
+    """
+    if not crossing.any():
+        return False
+    end = max(ends.max(), meta_onsets.max(initial=0))
+    return end in bars and (end in meta_onsets or ((onsets == end) & (ends == end)).any())
+
+def voiced_measures(onsets, ends, measures, measure_count):
+    """ music21 makeVoices가 성부로 나누는 마디 (마디 안에서 (시작, 끝) 순으로 이웃한 음이 겹침) """
+    sort = np.lexsort((ends, onsets, measures))
+    overlapping = (measures[sort][1:] == measures[sort][:-1]) & (onsets[sort][1:] < ends[sort][:-1])
+    voiced = np.zeros(measure_count, dtype=bool)
+    voiced[measures[sort][1:][overlapping]] = True
+    return voiced
+
+def build_part(notes, signatures, element_ticks, conductor_signatures, conductor_ticks, ticks_per_quarter):
+    """ 음이 있는 트랙 하나 → 파트 안 순서대로 (마디선에서 나눈) 음/화음 조각 배열들 """
+    ticks, ons, pitches, channels, velocities = notes
+    on_index, off_ticks = pair_notes(ticks, ons, pitches, channels)
+    starts = ticks[on_index]
+    drums = channels[on_index] == DRUM_CHANNEL
+    heads, last, sizes, voices_required = group_chords(starts, off_ticks, drums, ticks_per_quarter / max(QUANTIZE_DIVISORS))
+
+    # music21의 화음 길이는 마지막으로 묶인 음 기준
+    element_starts = starts[heads]
+    element_lengths = (off_ticks - starts)[last[heads]]
+    element_pitches = pitches[on_index][heads]
+    element_velocities = velocities[on_index][heads]
+    element_chords = sizes[heads] > 1
+    element_drums = drums[heads]
+    graces = element_lengths == 0
+    if not len(element_starts):
+        return tuple(np.zeros(0, dtype=dtype) for dtype in (np.int64,) * 4 + (bool,) * 4 + (np.int64, bool, np.int64))
+
+    # 시작 위치와 길이 양자화 (길이는 메타 요소를 포함해 다음으로 시작하는 요소까지의 간격을 고려)
+    onsets = quantize_offsets(element_starts / ticks_per_quarter)
+    meta_onsets = quantize_offsets(np.array(element_ticks) / ticks_per_quarter)
+    all_onsets = np.unique(np.concatenate([onsets, meta_onsets]))
+    following = np.searchsorted(all_onsets, onsets, side="right")
+    has_next = following < len(all_onsets)
+    gaps = np.zeros(len(onsets))
+    gaps[has_next] = (all_onsets[following[has_next]] - onsets[has_next]) / UNITS_PER_QUARTER
+    durations = quantize_durations(element_lengths / ticks_per_quarter, gaps, graces)
+
+    # 마디: 앞선 음 없는 트랙의 박자표, 없으면 이 트랙의 박자표, 그것도 없으면 4/4
+    if conductor_signatures:
+        meter = signature_units(conductor_signatures, ticks_per_quarter)
+        if meter[0][0] != 0:
+            meter.insert(0, (0, 4 * UNITS_PER_QUARTER))
+    else:
+        meter = signature_units(signatures, ticks_per_quarter) or [(0, 4 * UNITS_PER_QUARTER)]
+        if meter[0][0] != 0:
+            raise ValueError("첫 박자표가 곡 처음에 없습니다.")
+    ends = onsets + durations
+    meta_onsets = np.concatenate([meta_onsets, quantize_offsets(np.array(conductor_ticks) / ticks_per_quarter)])
+    bars = bar_lines(meter, max(ends.max(), meta_onsets.max(initial=0)))
+
+    # 마디선을 넘는 음은 마디마다 조각으로 나눔
+    first_inside = np.searchsorted(bars, onsets, side="right")
+    splits = np.searchsorted(bars, ends, side="left") - first_inside
+    splits = np.where(durations > 0, np.maximum(splits, 0), 0)
+    if has_stale_measures(onsets, ends, element_chords & (splits > 0), bars, meta_onsets):
+        raise ValueError("마디선을 넘는 화음의 마디 위치를 music21과 같게 맞출 수 없는 파일입니다.")
+    repeats = splits + 1
+    order = np.repeat(np.arange(len(onsets)), repeats)
+    piece = np.arange(len(order)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    if voices_required and splits.any():
+        # 성부로 나뉜 마디에 걸친 붙임줄은 성부 순서와 마디 길이 캐시가 얽혀 있어 music21에 맡김
+        measures = first_inside - 1
+        touched = (measures[order] + piece)[splits[order] > 0]
+        if voiced_measures(onsets, ends, measures, len(bars))[touched].any():
+            raise ValueError("성부로 나뉜 마디에 걸친 붙임줄은 music21로 읽어야 합니다.")
+    boundary = np.repeat(first_inside, repeats) + piece - 1
+    piece_starts = np.where(piece > 0, bars[np.maximum(boundary, 0)], onsets[order])
+    piece_ends = np.where(piece < splits[order], bars[np.minimum(boundary + 1, len(bars) - 1)], ends[order])
+    continued = piece > 0
+    # 넘어온 조각은 직전 마디에서의 앞 조각 순서를 따름
+    parent_onsets = np.where(piece > 1, bars[np.maximum(boundary - 1, 0)], np.where(continued, onsets[order], 0))
+    parent_continued = piece > 1
+
+    return (
+        piece_starts,
+        piece_ends - piece_starts,
+        element_pitches[order],
+        element_velocities[order],
+        element_chords[order],
+        element_drums[order],
+        graces[order],
+        continued,
+        parent_onsets,
+        parent_continued,
+        order,
+    )
@@ -0,0 +1,22 @@
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# CPU를 많이 쓰는 요청(코드 타임라인, 일괄 비교)이 함께 쓰는 작업 프로세스 수
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", os.cpu_count() or 1))
+
+executor = None
+executor_lock = threading.Lock()
+
+def get_executor():
+    """ 프로세스 전체에서 하나만 쓰는 작업 프로세스 풀 (첫 요청 때 생성)
+
+    서버 안에는 튜너/DSP/PortAudio 스레드가 돌고 있어 fork하면 그 스레드가 잡고 있던 락이 자식에서 영영 풀리지 않을 수 있으므로,
+    ProcessAnalyzer와 같이 spawn으로 시작한다.
+    """
+    global executor
+    with executor_lock:
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=WORKER_PROCESSES, mp_context=mp.get_context("spawn"))
+        return executor
@@ -1,13 +1,79 @@
-import time
+import os
+import json
+import logging
 import numpy as np
-import pyaudio
 import asyncio
-from threading import Thread
+from threading import Thread, Event, Lock, current_thread
 from fastapi import WebSocket, APIRouter
-from tuner_audio.threading_helper import ProtectedList
+from tuner_audio.threading_helper import SampleQueue
 from tuner_audio.audio_analyzer import AudioAnalyzer
+from tuner_audio.process_analyzer import ProcessAnalyzer
+from audio_io.device_manager import device_manager
+from audio_io.sources import open_source
+from tuner_audio.pitch_engines import PITCH_ENGINES
+from tuner_audio.strum_tune import TUNINGS
+from monitoring import metrics
 
 tuner_router = APIRouter()
+logger = logging.getLogger(__name__)
+
+SEND_TIME = metrics.stage_histogram("tuner", "websocket_send")
+EVICTED_CLIENTS = metrics.registry.counter("tuner_evicted_clients_total", "Tuner websocket clients dropped for slow or failed sends")
+
+class BroadcastHub:
+    """ 메인 이벤트 루프에서 동작하는 튜너 결과 브로드캐스트 허브
+
+    클라이언트마다 최신 값 하나만 담는 큐와 전송 태스크를 두어 동시에 보내고,
+    느리거나 끊긴 소켓은 다른 클라이언트를 막지 않고 내보낸다.
+    """
+
+    SEND_TIMEOUT = 1.0  # 이 시간 안에 전송이 끝나지 않으면 느린 클라이언트로 보고 제거
+
+    def __init__(self):
+        self.loop = None
+        self.clients = {}  # websocket -> (queue, sender task)
+        self.on_empty = None  # 마지막 클라이언트가 빠졌을 때 호출할 코루틴 함수
+
+    def add(self, websocket: WebSocket):
+        self.loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=1)
+        task = asyncio.create_task(self.sender(websocket, queue))
+        self.clients[websocket] = (queue, task)
+
+    async def remove(self, websocket: WebSocket):
+        entry = self.clients.pop(websocket, None)
+        if entry and entry[1] is not asyncio.current_task():
+            entry[1].cancel()
+        if not self.clients and self.on_empty:
+            await self.on_empty()
+
+    async def sender(self, websocket: WebSocket, queue: asyncio.Queue):
+        while True:
+            data = await queue.get()
+            try:
+                start = metrics.now()
+                await asyncio.wait_for(websocket.send_json(data), self.SEND_TIMEOUT)
+                SEND_TIME.observe_since(start)
+            except Exception:
+                EVICTED_CLIENTS.inc()
+                await self.remove(websocket)
+                try:
+                    await asyncio.wait_for(websocket.close(code=1013), self.SEND_TIMEOUT)
+                except Exception:
+                    pass
+                return
+
+    def publish(self, data):
+        """ 이벤트 루프에서 호출: 각 클라이언트 큐의 이전 값을 최신 값으로 교체 """
+        for queue, _ in list(self.clients.values()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(data)
+
+    def publish_threadsafe(self, data):
+        """ 분석 스레드에서 호출 """
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.publish, data)
 
 class Tuner:
     """ Guitar tuner using AudioAnalyzer """
@@ -15,109 +81,152 @@ class Tuner:
     A4_FREQ = 440  # A4 기준 주파수
     MIN_FREQ = 50  # 최소 감지 주파수
     ROLLING_AVG_WINDOW = 3  # 이동 평균 필터 창 크기
+    QUEUE_TIMEOUT = 0.2  # 새 주파수를 기다리는 최대 시간 (정지/클라이언트 확인 주기)
 
-    def __init__(self):
-        self.queue = ProtectedList(buffer_size=8)
+    def __init__(self, pitch_engine=None, audio_source=None):
+        # 피치 엔진 설정 ("hps" 기본, 짧은 지연이 필요하면 "yin")
+        self.pitch_engine = pitch_engine or os.getenv("TUNER_PITCH_ENGINE", "hps")
+        self.strum_tuning = None  # 스트럼 튜닝 모드의 튜닝 이름 (None이면 단음 모드)
+        # 오디오 소스 ("live" 기본, 장치 없이 돌릴 때는 "file:<경로>" / "synth:<주파수>", audio_io.sources.open_source 참고)
+        self.audio_source = audio_source or os.getenv("TUNER_AUDIO_SOURCE", "live")
+        # 1이면 캡처와 피치 분석을 별도 프로세스에서 실행 (공유 메모리 링, 웹 서버 부하와 분리)
+        self.capture_process = os.getenv("TUNER_CAPTURE_PROCESS", "0") == "1"
+        self.queue = SampleQueue(buffer_size=8)
         self.analyzer = None  # 기존 analyzer를 None으로 설정
         self.running = False
-        self.last_freqs = []
-        self.clients = set()
+        self.last_freqs = {}  # 채널 -> 최근 주파수 목록
+        self.hub = BroadcastHub()
+        self.hub.on_empty = self.check_clients
         self.thread = None  # 실행 중인 스레드 저장
+        self.stop_event = None  # 실행 중인 세션의 정지 신호 (세션마다 새로 만듦)
+        self.lock = Lock()  # 시작/정지 상태 전환 보호 (analyzer 종료 대기는 락 밖에서)
 
-    def get_audio_interface_index(self):
-        """ 오디오 인터페이스(예: US-2x2HR) 인덱스를 찾음 """
-        audio = pyaudio.PyAudio()
-        for i in range(audio.get_device_count()):
-            dev_info = audio.get_device_info_by_index(i)
-            if "US-2x2HR" in dev_info["name"]:  # 원하는 오디오 인터페이스 이름 입력
-                return i
-        return None  # 기본 장치를 사용
+    def get_audio_interface(self):
+        """ 오디오 인터페이스(예: US-2x2HR) 이름을 찾음 (장치 목록은 장치 관리자가 캐시, 없으면 기본 장치를 사용) """
+        return device_manager.find_input("US-2x2HR")  # 원하는 오디오 인터페이스 이름 입력
 
-    async def register_client(self, websocket: WebSocket):
-        """ WebSocket 클라이언트 등록 """
-        await websocket.accept()
-        self.clients.add(websocket)
-
-        try:
-            while True:
-                await asyncio.sleep(1)
-        except:
-            self.clients.remove(websocket)
-            await self.check_clients()
-
-    async def send_data(self, frequency, note):
-        """ WebSocket으로 주파수 및 음계 전송 """
-        data = {"frequency": frequency, "note": note}
-        disconnected_clients = []
-
-        for client in self.clients:
-            try:
-                await client.send_json(data)
-            except Exception:
-                disconnected_clients.append(client)
-
-        for client in disconnected_clients:
-            self.clients.remove(client)
-
-        await self.check_clients()
-
-    def get_stable_frequency(self, freq):
-        """ 주파수를 안정적으로 필터링 """
+    def get_stable_frequency(self, freq, channel=0):
+        """ 채널별로 주파수를 안정적으로 필터링 """
         if freq < self.MIN_FREQ:
             return None
 
-        self.last_freqs.append(freq)
-        if len(self.last_freqs) > self.ROLLING_AVG_WINDOW:
-            self.last_freqs.pop(0)
+        last_freqs = self.last_freqs.setdefault(channel, [])
+        last_freqs.append(freq)
+        if len(last_freqs) > self.ROLLING_AVG_WINDOW:
+            last_freqs.pop(0)
 
-        return np.mean(self.last_freqs)
+        return np.mean(last_freqs)
 
-    def run(self):
-        """ 주파수 분석 실행 및 WebSocket 전송 """
-        if self.running:
-            return
+    def set_strum_tuning(self, tuning):
+        """ 스트럼 튜닝 모드 전환 (tuning=None이면 단음 모드). 알 수 없는 튜닝/미지원 엔진이면 ValueError """
+        if tuning and tuning not in TUNINGS:
+            raise ValueError(f"알 수 없는 튜닝: {tuning} (사용 가능: {', '.join(TUNINGS)})")
+        if tuning and not PITCH_ENGINES[self.pitch_engine].supports_strum:
+            raise ValueError(f"{self.pitch_engine} 엔진은 스트럼 튜닝을 지원하지 않음")
+        with self.lock:
+            self.strum_tuning = tuning
+            analyzer = self.analyzer
+        if analyzer:
+            analyzer.set_strum_tuning(tuning, self.A4_FREQ)
 
-        self.running = True
-        self.analyzer = AudioAnalyzer(self.queue, input_device_index=self.get_audio_interface_index())  # 🔹 새 analyzer 생성
-        self.analyzer.start()
+    def build_reading(self, freqs, strings=None):
+        """ 채널별 주파수 목록 → 전송할 메시지 (안정된 채널도, 스트럼 결과도 없으면 None)
 
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        frequency/note는 기존 클라이언트를 위한 첫 채널 값이고, channels에 입력별 값이 들어간다.
+        스트럼 튜닝 중이면 채널마다 strings(줄별 센트 오차)가 붙고, 맨 위 strings는 첫 채널 값이다.
+        """
+        channels = []
+        for channel, freq in enumerate(freqs):
+            stable_freq = self.get_stable_frequency(freq, channel) if freq else None
+            note = AudioAnalyzer.frequency_to_note_name(stable_freq, self.A4_FREQ) if stable_freq else None
+            channels.append({"channel": channel, "frequency": stable_freq, "note": note})
 
-        while self.running:
-            if not self.clients:
-                self.running = False
-                break
+        if strings:
+            for reading, channel_strings in zip(channels, strings):
+                reading["strings"] = channel_strings
+        elif not any(reading["frequency"] for reading in channels):
+            return None
+        for reading in channels:
+            if reading["frequency"]:
+                logger.debug("Channel %d: %.2f Hz → Nearest Note: %s", reading["channel"], reading["frequency"], reading["note"])
+
+        message = {"frequency": channels[0]["frequency"], "note": channels[0]["note"], "channels": channels}
+        if strings:
+            message["tuning"] = self.strum_tuning
+            message["strings"] = channels[0]["strings"]
+        return message
 
-            freq = self.queue.get()
-            if freq:
-                stable_freq = self.get_stable_frequency(freq)
-                if stable_freq:
-                    note = self.analyzer.frequency_to_note_name(stable_freq, self.A4_FREQ)
-                    print(f"Detected Frequency: {stable_freq:.2f} Hz → Nearest Note: {note}")
+    def create_analyzer(self):
+        if self.capture_process:
+            input_device = self.get_audio_interface() if self.audio_source == "live" else None
+            return ProcessAnalyzer(
+                self.queue, input_device=input_device, pitch_engine=self.pitch_engine, source_spec=self.audio_source
+            )
+        if self.audio_source == "live":
+            return AudioAnalyzer(
+                self.queue, input_device=self.get_audio_interface(), pitch_engine=self.pitch_engine
+            )  # 🔹 새 analyzer 생성
+        source = open_source(self.audio_source, AudioAnalyzer.SAMPLING_RATE, AudioAnalyzer.CHUNK_SIZE)
+        return AudioAnalyzer(self.queue, pitch_engine=self.pitch_engine, source=source)
 
-                    loop.run_until_complete(self.send_data(stable_freq, note))
+    def run(self, stop_event):
+        """ 주파수 분석 실행 및 WebSocket 전송 (세션 하나, stop_event가 켜지면 자기 analyzer를 정리하고 끝남) """
+        analyzer = self.create_analyzer()
+        with self.lock:
+            if stop_event.is_set():
+                return
+            self.analyzer = analyzer
+            if self.strum_tuning:
+                analyzer.set_strum_tuning(self.strum_tuning, self.A4_FREQ)
+        analyzer.start()
+
+        try:
+            while not stop_event.is_set():
+                if not self.hub.clients:
+                    with self.lock:
+                        if self.stop_event is stop_event:
+                            self.running = False
+                    break
 
-            time.sleep(0.02)
+                # 새 주파수가 들어오는 즉시 깨어남 (입력 채널별 주파수 목록)
+                item = self.queue.get(timeout=self.QUEUE_TIMEOUT)
+                if item:
+                    reading = self.build_reading(*item)
+                    if reading:
+                        # 전송은 메인 루프의 허브가 담당 (분석 스레드는 기다리지 않음)
+                        self.hub.publish_threadsafe(reading)
+        finally:
+            analyzer.running = False
+            analyzer.join()
+            # 그사이 새 세션이 시작됐으면 그 analyzer는 건드리지 않음
+            with self.lock:
+                if self.analyzer is analyzer:
+                    self.analyzer = None
 
     async def check_clients(self):
-        if not self.clients:
-            self.stop()
+        if not self.hub.clients:
+            # analyzer 스레드 종료 대기가 이벤트 루프를 막지 않도록 executor에서 정지
+            await asyncio.get_running_loop().run_in_executor(None, self.stop)
 
     def stop(self): # 튜너 정지
-        if not self.running:
-            return
-
-        self.running = False
-        if self.analyzer:
-            self.analyzer.running = False
-            self.analyzer.join()
-            self.analyzer = None  # 기존 analyzer 제거
-        self.thread = None  # 스레드 초기화
+        with self.lock:
+            if not self.running:
+                return
+            self.running = False
+            stop_event, thread = self.stop_event, self.thread
+            self.stop_event = self.thread = None
+        # 이 세션만 정지하고 끝날 때까지 기다림 (그동안 재접속으로 시작된 새 세션은 그대로 둠)
+        stop_event.set()
+        if thread is not current_thread():
+            thread.join()
 
     def restart(self):
-        if not self.running and (self.thread is None or not self.thread.is_alive()):
-            self.thread = Thread(target=self.run, daemon=True)
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            self.stop_event = Event()
+            self.thread = Thread(target=self.run, args=(self.stop_event,), daemon=True)
             self.thread.start()
 
 tuner = Tuner()
@@ -126,16 +235,25 @@ tuner = Tuner()
 async def websocket_endpoint(websocket: WebSocket):
     """ WebSocket 엔드포인트 """
     await websocket.accept()
-    tuner.clients.add(websocket)
+    tuner.hub.add(websocket)
 
     tuner.restart()  # WebSocket 연결 시 튜너 재시작
 
     try:
         while True:
-            await asyncio.sleep(1)
-    except:
-        tuner.clients.remove(websocket)
-        await tuner.check_clients()
+            # 아무 메시지 안 보내도 닫히면 예외 발생함
+            # {"mode": "strum", "tuning": "drop_d"} / {"mode": "pitch"} 로 스트럼 튜닝 모드 전환 (모든 클라이언트 공통)
+            message = await websocket.receive_text()
+            try:
+                request = json.loads(message)
+                tuning = request.get("tuning", "standard") if request.get("mode") == "strum" else None
+                tuner.set_strum_tuning(tuning)
+            except (ValueError, AttributeError) as e:
+                await websocket.send_json({"error": str(e)})
+    except Exception:
+        pass
+    finally:
+        await tuner.hub.remove(websocket)
 
 @tuner_router.on_event("startup")
 def start_tuner():
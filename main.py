@@ -7,6 +7,8 @@ from function.mxlConverter import mxl_router
 from function.db_run import db_run_router
 from fastapi.staticfiles import StaticFiles
 from function.chordprac import chordprac_router
+from function.chordchart import chordchart_router
+from function.metrics import metrics_router
 import os
 
 app = FastAPI()
@@ -30,4 +32,6 @@ app.include_router(compare_router)
 app.include_router(tuner_router)
 app.include_router(mxl_router)
 app.include_router(db_run_router)
-app.include_router(chordprac_router)
\ No newline at end of file
+app.include_router(chordprac_router)
+app.include_router(chordchart_router)
+app.include_router(metrics_router)
\ No newline at end of file
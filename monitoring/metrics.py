@@ -0,0 +1,139 @@
+import os
+import time
+from bisect import bisect_left
+from threading import Lock
+
+# DSP_METRICS=1 일 때만 수집 (꺼져 있으면 시간 측정 호출이 바로 반환됨)
+ENABLED = os.getenv("DSP_METRICS", "0") == "1"
+
+# 프레임 단위 DSP 단계용 버킷 (초): 20us ~ 1s
+DEFAULT_BUCKETS = (
+    0.00002, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+def enable(enabled=True):
+    global ENABLED
+    ENABLED = enabled
+
+def now():
+    """ 단계 시작 시각 (수집이 꺼져 있으면 0) """
+    return time.perf_counter() if ENABLED else 0.0
+
+def format_labels(labels, extra=None):
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+class Counter:
+    """ 단조 증가 카운터 """
+
+    def __init__(self, name, labels=()):
+        self.name = name
+        self.labels = labels
+        self.value = 0
+        self.lock = Lock()
+
+    def inc(self, amount=1):
+        if not ENABLED:
+            return
+        with self.lock:
+            self.value += amount
+
+    def render(self):
+        return [f"{self.name}{format_labels(self.labels)} {self.value}"]
+
+class UsageCounter(Counter):
+    """ DSP_METRICS와 관계없이 항상 세는 카운터 (캐시 적중처럼 요청 단위로 드물게 오르는 DSP 밖 지표) """
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+class Histogram:
+    """ 고정 버킷 지연 시간 히스토그램 """
+
+    def __init__(self, name, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.labels = labels
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = Lock()
+
+    def observe(self, value):
+        if not ENABLED:
+            return
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def observe_since(self, start):
+        # start는 now()의 반환값
+        if ENABLED and start:
+            self.observe(time.perf_counter() - start)
+
+    def render(self):
+        with self.lock:
+            counts = list(self.counts)
+            total = self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{format_labels(self.labels, ('le', repr(bound)))} {cumulative}")
+        cumulative += counts[-1]
+        lines.append(f"{self.name}_bucket{format_labels(self.labels, ('le', '+Inf'))} {cumulative}")
+        lines.append(f"{self.name}_sum{format_labels(self.labels)} {total}")
+        lines.append(f"{self.name}_count{format_labels(self.labels)} {cumulative}")
+        return lines
+
+class Registry:
+    """ 이름별로 메트릭을 모아 Prometheus 텍스트 포맷으로 출력 """
+
+    def __init__(self):
+        self.families = {}  # name -> (type, help, {labels: metric})
+        self.lock = Lock()
+
+    def get(self, cls, kind, name, help_text, labels):
+        labels = tuple(sorted(labels.items()))
+        with self.lock:
+            family = self.families.setdefault(name, (kind, help_text, {}))
+            metric = family[2].get(labels)
+            if metric is None:
+                metric = family[2][labels] = cls(name, labels)
+            return metric
+
+    def counter(self, name, help_text="", **labels):
+        return self.get(Counter, "counter", name, help_text, labels)
+
+    def usage_counter(self, name, help_text="", **labels):
+        return self.get(UsageCounter, "counter", name, help_text, labels)
+
+    def histogram(self, name, help_text="", **labels):
+        return self.get(Histogram, "histogram", name, help_text, labels)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            families = [(name, kind, help_text, list(metrics.values())) for name, (kind, help_text, metrics) in self.families.items()]
+        for name, kind, help_text, metrics in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for metric in metrics:
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+def stage_histogram(pipeline, stage):
+    """ DSP 단계별 처리 시간 히스토그램 (예: pipeline="chord", stage="fft") """
+    return registry.histogram("dsp_stage_seconds", "Per-frame latency of each DSP stage", pipeline=pipeline, stage=stage)
+
+def dropped_frames(pipeline, reason):
+    return registry.counter("dsp_dropped_frames_total", "Audio frames dropped before processing", pipeline=pipeline, reason=reason)
+
+def input_overflows(pipeline):
+    return registry.counter("audio_input_overflows_total", "Input overflows reported by the audio device", pipeline=pipeline)
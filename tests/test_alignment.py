@@ -0,0 +1,83 @@
+""" banded_dtw를 칸마다 직접 계산하는 작은 DTW와 비교 """
+import numpy as np
+import pytest
+
+from function.alignment import BLOCK_ROWS, band_limits, banded_dtw
+
+def reference_dtw(seq1, seq2, tolerance, allowed=None):
+    """ (n+1)×(m+1) 전체 표로 계산한 최소 틀린 칸 수 (allowed(i, j)가 False인 칸은 지나지 않음) """
+    n, m = len(seq1), len(seq2)
+    cost = np.full((n + 1, m + 1), np.inf)
+    cost[0, 0] = 0.0
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            if allowed is not None and not allowed(i - 1, j - 1):
+                continue
+            mismatch = float(abs(seq1[i - 1] - seq2[j - 1]) > tolerance)
+            cost[i, j] = mismatch + min(cost[i - 1, j - 1], cost[i - 1, j], cost[i, j - 1])
+    return cost[n, m]
+
+def in_band(n, m, band):
+    lo, hi = band_limits(n, m, band)
+    return lambda i, j: lo[i] <= j <= hi[i]
+
+def check(seq1, seq2, tolerance, band):
+    n, m = len(seq1), len(seq2)
+    mismatches, path, mismatch = banded_dtw(seq1, seq2, tolerance, band)
+
+    # 경로: (0, 0) → (n-1, m-1), 한 걸음에 i, j가 0 또는 1씩 늘고 적어도 하나는 늘어남, 모두 대역 안
+    assert tuple(path[0]) == (0, 0) and tuple(path[-1]) == (n - 1, m - 1)
+    steps = np.diff(path, axis=0)
+    assert ((steps >= 0) & (steps <= 1)).all() and (steps.sum(axis=1) >= 1).all()
+    inside = in_band(n, m, band if band is not None else max(n, m))
+    assert all(inside(i, j) for i, j in path)
+
+    # 칸별 틀림 여부와 합계가 경로와 맞고, 합계가 대역 안 최소 비용과 같음
+    expected = np.abs(np.asarray(seq1)[path[:, 0]] - np.asarray(seq2)[path[:, 1]]) > tolerance
+    np.testing.assert_array_equal(mismatch, expected)
+    assert mismatches == int(expected.sum())
+    if band is not None:
+        assert mismatches == reference_dtw(seq1, seq2, tolerance, in_band(n, m, band))
+    return mismatches
+
+def test_random_sequences_match_reference():
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        n, m = rng.integers(1, 30, size=2)
+        seq1, seq2 = rng.integers(0, 6, n), rng.integers(0, 6, m)
+        check(seq1, seq2, 1, int(rng.integers(0, 12)))
+
+@pytest.mark.parametrize("n, m", [(1, 1), (1, 7), (7, 1), (1, 60), (60, 1), (2, 90), (90, 3), (45, 4)])
+@pytest.mark.parametrize("band", [0, 1, 5])
+def test_edge_shapes_match_reference(n, m, band):
+    rng = np.random.default_rng(n * 100 + m)
+    check(rng.integers(0, 4, n), rng.integers(0, 4, m), 0, band)
+
+def test_wide_band_is_unconstrained_dtw():
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        n, m = rng.integers(1, 25, size=2)
+        seq1, seq2 = rng.normal(size=n), rng.normal(size=m)
+        assert check(seq1, seq2, 0.5, max(n, m)) == reference_dtw(seq1, seq2, 0.5)
+
+def test_rows_across_blocks_match_reference():
+    rng = np.random.default_rng(2)
+    n = BLOCK_ROWS * 2 + 37
+    seq1 = rng.integers(40, 60, n)
+    seq2 = np.delete(np.insert(seq1, 100, 70), [300, 400])
+    check(seq1, seq2, 0, 6)
+
+def test_inserted_note_costs_one_mismatch():
+    seq1 = np.arange(40.0, 80.0)
+    seq2 = np.insert(seq1, 10, 100.0)
+    mismatches, path, mismatch = banded_dtw(seq1, seq2, 0.5)
+    assert mismatches == 1
+    assert tuple(path[mismatch][0]) in ((9, 10), (10, 10))
+
+def test_band_limits_cover_diagonal_and_corners():
+    for n, m, band in [(1, 1, 0), (1, 9, 0), (9, 1, 0), (10, 40, 0), (40, 10, 2), (33, 33, 3)]:
+        lo, hi = band_limits(n, m, band)
+        assert lo[0] == 0 and hi[-1] == m - 1
+        assert (lo <= hi).all() and (hi[:-1] >= lo[1:]).all()  # 이웃한 줄의 범위가 이어짐
+        centers = np.arange(n) * ((m - 1) / (n - 1)) if n > 1 else np.zeros(1)
+        assert (lo <= np.floor(centers)).all() and (hi >= np.ceil(centers)).all()
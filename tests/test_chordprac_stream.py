@@ -0,0 +1,131 @@
+""" /ws/chordprac/stream (클라이언트 PCM 스트리밍 모드)를 스크립트 웹소켓 클라이언트로 확인 (사운드카드 불필요) """
+import threading
+
+import numpy as np
+import pytest
+from fastapi import FastAPI, WebSocketDisconnect
+from fastapi.testclient import TestClient
+
+from function import chordprac
+from function.chordprac import BUFFER_SIZE, chordprac_router
+
+WAIT_SECONDS = 5
+
+class FakeDetector:
+    """ 받은 블록을 기록하고 고정된 결과를 돌려줌 (gate가 있으면 첫 블록에서 gate가 열릴 때까지 멈춤) """
+
+    def __init__(self, gate=None):
+        self.blocks = []
+        self.gate = gate
+        self.started = threading.Event()
+
+    def process(self, audio):
+        self.blocks.append(audio)
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(WAIT_SECONDS)
+        return np.array([440.0]), ["A"], ("A", "major", 0.9)
+
+class FakePool:
+    def __init__(self, detector):
+        self.detector = detector
+        self.released = threading.Event()
+
+    def acquire(self, sample_rate=None):
+        return self.detector
+
+    def release(self, detector):
+        self.released.set()
+
+class CountingCounter:
+    """ STREAM_DROPS 대신 끼워 넣어, 버린 블록 수가 target에 닿으면 알림 """
+
+    def __init__(self, target):
+        self.value = 0
+        self.target = target
+        self.reached = threading.Event()
+
+    def inc(self, amount=1):
+        self.value += amount
+        if self.value >= self.target:
+            self.reached.set()
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(chordprac_router)
+    return TestClient(app)
+
+def use_detector(monkeypatch, detector):
+    pool = FakePool(detector)
+    monkeypatch.setattr(chordprac, "detector_pool", pool)
+    return pool
+
+def test_blocks_are_reassembled_from_odd_sized_frames(client, monkeypatch):
+    detector = FakeDetector()
+    pool = use_detector(monkeypatch, detector)
+    blocks = 3
+    samples = np.random.default_rng(0).integers(-32768, 32767, blocks * BUFFER_SIZE + 100).astype("<i2")
+    data = samples.tobytes()
+
+    with client.websocket_connect("/ws/chordprac/stream") as websocket:
+        websocket.send_json({"format": "int16", "sample_rate": 22050})
+        ready = websocket.receive_json()
+        assert ready["type"] == "ready"
+        assert ready["block_size"] == BUFFER_SIZE and ready["sample_rate"] == 22050
+
+        # 샘플 경계와 블록 경계 어느 쪽에도 맞지 않는 크기로 쪼개 보냄
+        position, sizes = 0, [1, 1001, 3, 4095, 777]
+        while position < len(data):
+            size = sizes[position % len(sizes)]
+            websocket.send_bytes(data[position:position + size])
+            position += size
+        results = [websocket.receive_json() for _ in range(blocks)]
+
+    assert pool.released.wait(WAIT_SECONDS)
+    assert len(detector.blocks) == blocks  # 남은 100샘플은 블록이 차지 않아 처리하지 않음
+    assert all(len(block) == BUFFER_SIZE for block in detector.blocks)
+    np.testing.assert_array_equal(np.concatenate(detector.blocks), samples[:blocks * BUFFER_SIZE] / 32768)
+    assert results[0]["chord"] == {"root": "A", "type": "major", "certainty": 0.9}
+    assert [result["stream"]["processed_blocks"] for result in results] == [1, 2, 3]
+    assert results[-1]["stream"] == {"received_blocks": 3, "processed_blocks": 3, "dropped_blocks": 0}
+
+def test_oldest_blocks_are_dropped_when_processing_falls_behind(client, monkeypatch):
+    queue_size, extra = 2, 3
+    gate = threading.Event()
+    detector = FakeDetector(gate)
+    use_detector(monkeypatch, detector)
+    drops = CountingCounter(extra)
+    monkeypatch.setattr(chordprac, "STREAM_QUEUE_SIZE", queue_size)
+    monkeypatch.setattr(chordprac, "STREAM_DROPS", drops)
+    block = np.arange(BUFFER_SIZE, dtype="<f4") / BUFFER_SIZE
+
+    with client.websocket_connect("/ws/chordprac/stream") as websocket:
+        websocket.send_json({"format": "float32", "sample_rate": 44100})
+        assert websocket.receive_json()["queue_size"] == queue_size
+        websocket.send_bytes(block.tobytes())
+        assert detector.started.wait(WAIT_SECONDS)  # 첫 블록 처리 중 (gate에서 멈춤)
+
+        websocket.send_bytes(np.tile(block, queue_size + extra).tobytes())
+        assert drops.reached.wait(WAIT_SECONDS)
+        gate.set()
+        results = [websocket.receive_json() for _ in range(1 + queue_size)]
+
+    assert results[-1]["stream"] == {
+        "received_blocks": 1 + queue_size + extra,
+        "processed_blocks": 1 + queue_size,
+        "dropped_blocks": extra,
+    }
+    assert drops.value == extra
+
+@pytest.mark.parametrize("first_message", ["not json", '{"format": "int8"}', '{"sample_rate": 1000}'])
+def test_bad_first_message_is_rejected(client, monkeypatch, first_message):
+    detector = FakeDetector()
+    use_detector(monkeypatch, detector)
+    with client.websocket_connect("/ws/chordprac/stream") as websocket:
+        websocket.send_text(first_message)
+        assert websocket.receive_json()["type"] == "error"
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_json()
+    assert closed.value.code == 1003
+    assert detector.blocks == []
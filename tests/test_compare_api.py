@@ -0,0 +1,53 @@
+""" MIDI 비교 API: 읽을 수 없는 업로드는 400, 특징 캐시 지표는 DSP_METRICS 없이도 셈, 두 채점 방식은 같은 항목·가중치 """
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from function import compare
+from function.feature_cache import FeatureCache, MEMORY_HITS
+from monitoring import metrics
+from test_midi_reader import GENERATED
+
+MIDI = GENERATED["format_0"]
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(compare, "feature_cache", FeatureCache(str(tmp_path)))
+    app = FastAPI()
+    app.include_router(compare.compare_router)
+    return TestClient(app)
+
+def upload(data, name="take.mid"):
+    return name, data, "audio/midi"
+
+def test_unreadable_upload_is_400(client):
+    response = client.post("/compare/", files={"file1": upload(MIDI), "file2": upload(b"not a midi file")})
+    assert response.status_code == 400
+
+    reference_id = client.post("/compare/references/", files={"file": upload(MIDI)}).json()["reference_id"]
+    response = client.post(f"/compare/references/{reference_id}", files={"file": upload(b"not a midi file")})
+    assert response.status_code == 400
+
+    response = client.post(f"/compare/references/{reference_id}", files={"file": upload(MIDI)})
+    assert response.status_code == 200 and response.json()["final_similarity"] == 1.0
+
+def test_cache_counters_count_without_dsp_metrics(client, monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    hits = MEMORY_HITS.value
+    client.post("/compare/", files={"file1": upload(MIDI), "file2": upload(MIDI)})
+    assert MEMORY_HITS.value > hits
+
+def test_scoring_modes_share_parts_and_weights():
+    pitches = np.arange(50.0, 90.0)
+    changed = pitches.copy()
+    changed[20] += 7
+    rhythms = np.tile([0.5, 1.0], 20)
+    reference = compare.MidiFeatures(pitches, rhythms, np.diff(pitches))
+    attempt = compare.MidiFeatures(changed, rhythms, np.diff(changed))
+
+    penalty = compare.compare_features(reference, attempt, "penalty")
+    aligned = compare.compare_features(reference, attempt, "dtw")
+    assert aligned.pop("alignment")["pitch"]["mismatch"].count(True) == 1
+    assert aligned == penalty
+    assert penalty["final_similarity"] == round(0.4 * 0.99 + 0.55 * 1.0 + 0.05 * 0.98, 3)
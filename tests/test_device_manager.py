@@ -0,0 +1,82 @@
+""" 가짜 sounddevice로 장치 관리자의 PortAudio 재초기화 시점 확인 """
+import threading
+import time
+
+import pytest
+
+from audio_io import device_manager as device_module
+from audio_io.device_manager import AudioDeviceManager
+
+class FakeStream:
+    def __init__(self, sd, **options):
+        self.sd = sd
+        self.options = options
+        self.closed = False
+
+    def start(self):
+        self.sd.opened += 1
+
+    def close(self):
+        self.closed = True
+
+class FakeSoundDevice:
+    def __init__(self, devices):
+        self.devices = devices
+        self.initializations = 0
+        self.opened = 0
+        self.reinitialized = threading.Event()
+
+    def query_devices(self):
+        return [dict(device, index=index) for index, device in enumerate(self.devices)]
+
+    def _terminate(self):
+        pass
+
+    def _initialize(self):
+        self.initializations += 1
+        self.reinitialized.set()
+
+    def InputStream(self, **options):
+        return FakeStream(self, **options)
+
+@pytest.fixture
+def sd(monkeypatch):
+    fake = FakeSoundDevice([{"name": "Built-in Microphone", "max_input_channels": 2}])
+    monkeypatch.setattr(device_module, "sd", fake)
+    return fake
+
+def test_missing_device_lookup_does_not_reinitialize(sd):
+    manager = AudioDeviceManager()
+    stream = manager.open_input(None, 48000, 1, 1024)
+    stream.subscribe(lambda indata, status: None)
+    manager.last_refresh = time.monotonic() - 60
+
+    for _ in range(3):
+        assert manager.find_input("US-2x2HR") is None
+    assert sd.initializations == 0
+    assert sd.opened == 1 and not stream.stream.closed
+
+def test_refresh_picks_up_a_plugged_in_device(sd):
+    manager = AudioDeviceManager()
+    assert manager.find_input("US-2x2HR") is None
+    sd.devices.append({"name": "US-2x2HR Audio", "max_input_channels": 2})
+    assert manager.find_input("US-2x2HR") is None  # 캐시된 목록
+    assert manager.refresh()
+    assert manager.find_input("US-2x2HR") == "US-2x2HR Audio"
+
+def test_recover_right_after_refresh_is_retried(sd, monkeypatch):
+    monkeypatch.setattr(AudioDeviceManager, "REFRESH_INTERVAL", 0.2)
+    manager = AudioDeviceManager()
+    stream = manager.open_input(None, 48000, 1, 1024)
+    stream.subscribe(lambda indata, status: None)
+    manager.refresh()
+    sd.reinitialized.clear()
+
+    # 재초기화 직후 장치가 끊김: 버리지 않고 간격이 끝날 때 한 번 다시 시도
+    manager.recover()
+    manager.recover()
+    assert not sd.reinitialized.is_set()
+    assert sd.reinitialized.wait(2)
+    time.sleep(0.3)
+    assert sd.initializations == 2
+    assert sd.opened == 3 and stream.stream is not None
@@ -0,0 +1,128 @@
+""" SMF 리더(function.midi_reader)가 music21과 같은 특징을 내는지, 깨진 입력에는 ValueError만 내는지 확인
+
+python -m pytest tests  (저장소 루트에서 실행)
+"""
+import glob
+import os
+import random
+
+import music21
+import numpy as np
+import pytest
+
+from function.compare import extract_features_music21, features_from_notes
+from function.midi_reader import MUSIC21_VERSION, parse_midi
+
+MUSIC21_DIR = os.path.dirname(music21.__file__)
+BUNDLED = sorted(glob.glob(os.path.join(MUSIC21_DIR, "**", "test*.mid"), recursive=True)
+                 + glob.glob(os.path.join(MUSIC21_DIR, "**", "k525*.mid"), recursive=True))
+# music21만 맞출 수 있어 리더가 ValueError로 넘기는 파일 (마디를 넘는 화음의 캐시된 마디 / 겹치는 성부)
+FALLBACK = {"test04.mid", "k525MIDIMvt1.mid"}
+
+TPQ = 480
+
+def vlq(value):
+    out = [value & 0x7F]
+    value >>= 7
+    while value:
+        out.append(0x80 | (value & 0x7F))
+        value >>= 7
+    return bytes(reversed(out))
+
+def track(events):
+    """ [(절대 tick, 이벤트 바이트)] → MTrk 청크 """
+    data, last = b"", 0
+    for tick, event in sorted(events, key=lambda e: e[0]):
+        data += vlq(tick - last) + event
+        last = tick
+    data += vlq(0) + b"\xff\x2f\x00"
+    return b"MTrk" + len(data).to_bytes(4, "big") + data
+
+def notes(spec, channel=0):
+    """ [(시작 4분음표, 끝 4분음표, 음높이)] → note on/off 이벤트 (같은 tick에서는 off 먼저) """
+    events = []
+    for on, off, pitch in spec:
+        events.append((round(on * TPQ), bytes([0x90 | channel, pitch, 80])))
+        events.append((round(off * TPQ), bytes([0x80 | channel, pitch, 0])))
+    events.sort(key=lambda e: (e[0], e[1][0] & 0xF0 == 0x90))
+    return events
+
+def time_signature(quarters, numerator, power):
+    return round(quarters * TPQ), bytes([0xFF, 0x58, 4, numerator, power, 24, 8])
+
+def smf(tracks, fmt=1):
+    header = b"MThd" + (6).to_bytes(4, "big") + fmt.to_bytes(2, "big")
+    header += len(tracks).to_bytes(2, "big") + TPQ.to_bytes(2, "big")
+    return header + b"".join(track(events) for events in tracks)
+
+GENERATED = {
+    # 마디를 넘는 음(붙임줄로 나뉨)과 마디 안의 화음
+    "ties_and_chords": smf([
+        [time_signature(0, 4, 2)],
+        notes([(0, 1, 60), (0, 1, 64), (0, 1, 67), (1, 2.5, 62), (2.5, 5.5, 65), (5.5, 6, 69),
+               (6, 7, 60), (6, 7, 63), (7, 10, 72)]),
+    ]),
+    # 박자표가 바뀌는 곡 (3/4 → 6/8 → 2/4)
+    "time_signature_changes": smf([
+        [time_signature(0, 3, 2), time_signature(6, 6, 3), time_signature(12, 2, 2)],
+        notes([(0, 2, 60), (2, 4, 62), (4, 7, 64), (7, 7.5, 65), (7.5, 9, 67), (9, 9.5, 69), (9.5, 13, 71),
+               (13, 14, 72), (13, 14, 76)]),
+    ]),
+    # 셋잇단/어긋난 시작점(양자화), 길이 0인 음, 두 파트
+    "quantization_and_parts": smf([
+        [time_signature(0, 4, 2)],
+        notes([(0, 1 / 3, 60), (1 / 3, 2 / 3, 62), (2 / 3, 1, 64), (1.02, 1.98, 65), (2, 2, 67), (2.01, 3.5, 69),
+               (3.5, 4.4, 71)]),
+        notes([(0, 2, 48), (0, 2, 55), (2, 4.5, 50), (4.5, 6, 52)], channel=1),
+    ]),
+    # 형식 0: 박자표와 음표가 한 트랙에
+    "format_0": smf([
+        [time_signature(0, 4, 2), time_signature(4, 3, 2)]
+        + notes([(0, 1.5, 60), (1.5, 4.5, 62), (4.5, 5, 64), (5, 7, 65), (5, 7, 69)]),
+    ], fmt=0),
+}
+
+def read_features(path):
+    with open(path, "rb") as f:
+        return features_from_notes(parse_midi(f.read()))
+
+def assert_same_features(features, expected):
+    for name, array in expected.arrays().items():
+        np.testing.assert_array_equal(features.arrays()[name], array, err_msg=name)
+
+def test_music21_version():
+    assert tuple(int(part) for part in music21.VERSION[:2]) == MUSIC21_VERSION
+
+@pytest.mark.parametrize("path", BUNDLED, ids=os.path.basename)
+def test_bundled_file_matches_music21(path):
+    if os.path.basename(path) in FALLBACK:
+        with pytest.raises(ValueError):
+            read_features(path)
+        return
+    assert_same_features(read_features(path), extract_features_music21(path))
+
+@pytest.mark.parametrize("name", sorted(GENERATED))
+def test_generated_file_matches_music21(name, tmp_path):
+    path = tmp_path / f"{name}.mid"
+    path.write_bytes(GENERATED[name])
+    assert_same_features(features_from_notes(parse_midi(GENERATED[name])), extract_features_music21(str(path)))
+
+def corrupted_inputs():
+    rng = random.Random(0)
+    for name, data in sorted(GENERATED.items()):
+        for size in range(len(data)):
+            yield f"{name}[:{size}]", data[:size]
+        for case in range(200):
+            damaged = bytearray(data)
+            for _ in range(rng.randint(1, 4)):
+                damaged[rng.randrange(len(damaged))] = rng.randrange(256)
+            yield f"{name}~{case}", bytes(damaged)
+
+def test_corrupted_input_raises_only_value_error():
+    for label, data in corrupted_inputs():
+        try:
+            parse_midi(data)
+        except ValueError:
+            pass
+        except Exception as error:
+            pytest.fail(f"{label}: {error!r}")
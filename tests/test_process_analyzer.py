@@ -0,0 +1,40 @@
+""" 캡처/분석 프로세스 튜너(ProcessAnalyzer)를 합성음 소스로 확인 (공유 메모리 정리 포함) """
+import gc
+import os
+
+import pytest
+
+from tuner_audio.process_analyzer import ProcessAnalyzer
+from tuner_audio.threading_helper import SampleQueue
+
+SHM_DIR = "/dev/shm"
+
+pytestmark = pytest.mark.skipif(not os.path.isdir(SHM_DIR), reason="POSIX 공유 메모리 디렉터리가 필요함")
+
+def shared_segments():
+    """ 지금 있는 공유 메모리/세마포어 (큐·이벤트의 세마포어는 객체가 정리될 때 지워지므로 gc 후에 셈) """
+    gc.collect()
+    return set(os.listdir(SHM_DIR))
+
+def test_unstarted_analyzer_leaves_no_shared_memory():
+    before = shared_segments()
+    analyzer = ProcessAnalyzer(SampleQueue(buffer_size=8), source_spec="synth:110")
+    assert analyzer.channels == 1
+    del analyzer
+    assert shared_segments() == before
+
+def test_analyzer_reports_synth_pitch_and_removes_ring():
+    before = shared_segments()
+    queue = SampleQueue(buffer_size=8)
+    analyzer = ProcessAnalyzer(queue, source_spec="synth:110")
+    analyzer.start()
+    try:
+        # 버퍼가 찰 때까지의 초기 값은 건너뛰고 마지막 결과를 봄
+        readings = [queue.get(timeout=2) for _ in range(60)]
+    finally:
+        analyzer.running = False
+        analyzer.join()
+    assert all(readings)
+    assert abs(readings[-1][0][0] - 110) < 3
+    del analyzer
+    assert shared_segments() == before
@@ -0,0 +1,44 @@
+""" 녹음/합성 오디오 소스와 소스 설정 문자열 확인 (장치 없이 실행) """
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from audio_io import sources
+from audio_io.sources import BufferedSource, open_source
+
+def test_short_recording_is_padded_to_one_block(tmp_path):
+    path = tmp_path / "short.npy"
+    np.save(path, np.full(500, 0.5, dtype=np.float32))
+    source = open_source(f"file:{path}", 8000, 1024)
+
+    blocks = list(source.blocks())
+    assert len(blocks) == 1 and blocks[0].shape == (1024, 1)
+    np.testing.assert_array_equal(blocks[0][:500, 0], 0.5)
+    np.testing.assert_array_equal(blocks[0][500:, 0], 0.0)
+
+def test_looped_short_recording_plays_in_real_time():
+    source = BufferedSource(np.ones(100), samplerate=8000, blocksize=800, loop=True)  # 블록당 0.1초
+    received = []
+    done = threading.Event()
+
+    def callback(indata, status):
+        received.append(indata)
+        if len(received) == 3:
+            done.set()
+
+    start = time.monotonic()
+    source.subscribe(callback)
+    assert done.wait(2)
+    source.unsubscribe(callback)
+    assert time.monotonic() - start >= 0.15  # 반복 재생도 블록 간격만큼 쉬며 보냄
+
+def test_empty_recording_is_rejected():
+    with pytest.raises(ValueError):
+        BufferedSource(np.zeros(0), samplerate=8000)
+
+def test_unknown_live_device_is_rejected(monkeypatch):
+    monkeypatch.setattr(sources.device_manager, "find_input", lambda pattern: None)
+    with pytest.raises(ValueError, match="US-2x2HR"):
+        open_source("live:US-2x2HR", 48000, 1024)
@@ -1,12 +1,17 @@
 import sys
 import numpy as np
-import copy
-from threading import Thread
-from pyaudio import PyAudio, paInt16
-from tuner_audio.threading_helper import ProtectedList
+from collections import deque
+from threading import Thread, Event
+from audio_io.device_manager import device_manager
+from tuner_audio.pitch_engines import make_pitch_engine
+from monitoring import metrics
+
+QUEUE_DROPS = metrics.dropped_frames("tuner", "queue_full")
+RING_DROPS = metrics.dropped_frames("tuner", "callback_ring_full")
+INPUT_OVERFLOWS = metrics.input_overflows("tuner")
 
 class AudioAnalyzer(Thread):
-    """ This AudioAnalyzer reads the microphone and finds the frequency of the loudest tone. """
+    """ This AudioAnalyzer reads the microphone and finds the frequency of the loudest tone on each input channel. """
 
     # 설정값: 기타 같은 현악기 소리를 감지하도록 조정됨
     SAMPLING_RATE = 48000  # 일반적으로 44100 또는 48000 사용
@@ -14,31 +19,44 @@ class AudioAnalyzer(Thread):
     BUFFER_TIMES = 50  # 버퍼 크기 결정
     ZERO_PADDING = 3  # FFT 계산 시 제로 패딩 (분해능 향상)
     NUM_HPS = 3  # Harmonic Product Spectrum 적용 단계
+    BLOCK_RING_SIZE = 8  # 오디오 콜백과 분석 스레드 사이의 블록 링 크기
+    WAIT_TIMEOUT = 0.2  # 블록을 기다리는 최대 시간 (정지 확인 주기)
+
+    INT16_SCALE = 32768  # 피치 엔진은 int16 크기 기준 (float32 -1~1 입력을 같은 크기로 맞춤)
 
     NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
 
-    def __init__(self, queue, input_device_index=None):
+    def __init__(self, queue, input_device=None, pitch_engine="hps", channels=None, source=None):
         super().__init__()  # Thread 초기화 (불필요한 인자 전달 방지)
         self.queue = queue
-        self.buffer = np.zeros(self.CHUNK_SIZE * self.BUFFER_TIMES)
-        self.hanning_window = np.hanning(len(self.buffer))
         self.running = False
-        self.input_device_index = input_device_index  # 입력 장치 인덱스 저장
-
-        try:
-            self.audio_object = PyAudio()
-            self.stream = self.audio_object.open(
-                format=paInt16,
-                channels=1,
-                rate=self.SAMPLING_RATE,
-                input=True,
-                output=False,
-                frames_per_buffer=self.CHUNK_SIZE,
-                input_device_index=self.input_device_index  # 장치 인덱스 적용
-            )
-        except Exception as e:
-            sys.stderr.write(f'Error: Line {sys.exc_info()[-1].tb_lineno} {type(e).__name__} {e}\n')
-            return
+        self.input_device = input_device  # 입력 장치 이름 (None이면 기본 입력 장치)
+
+        # 오디오 소스 (audio_io.sources: 녹음 파일/합성음). 없으면 장치 관리자의 공유 입력 스트림
+        # (채널 수를 정하지 않으면 지정한 장치의 입력 채널 전부, 기본 장치는 모노)
+        self.source = source or device_manager.open_input(input_device, self.SAMPLING_RATE, channels, self.CHUNK_SIZE)
+        self.channels = self.source.channels
+        self.blocks = deque(maxlen=self.BLOCK_RING_SIZE)
+        self.block_ready = Event()
+
+        # 피치 추정 엔진 선택 ("hps": FFT+HPS, "yin": 시간 영역 YIN)
+        self.pitch_engine = self.create_pitch_engine(
+            pitch_engine, self.source.samplerate, self.source.blocksize, self.channels
+        )
+
+    @classmethod
+    def create_pitch_engine(cls, pitch_engine, samplerate, blocksize, channels):
+        """ 튜너 설정값으로 피치 엔진 생성 (분석 프로세스의 ProcessAnalyzer도 같은 설정을 씀) """
+        options = {}
+        if pitch_engine == "hps":
+            options = dict(buffer_times=cls.BUFFER_TIMES, zero_padding=cls.ZERO_PADDING, num_hps=cls.NUM_HPS)
+        return make_pitch_engine(pitch_engine, samplerate, blocksize, channels=channels, **options)
+
+    @classmethod
+    def analyze_block(cls, pitch_engine, data):
+        """ (프레임 × 채널) float32 블록을 피치 엔진에 넣고 → (채널별 주파수 목록, 줄별 결과 또는 None) (data는 그대로 둠) """
+        pitch_engine.push(data * cls.INT16_SCALE)
+        return pitch_engine.estimate_channels(), pitch_engine.string_readings
 
     @staticmethod
     def frequency_to_number(freq, a4_freq=440.0):
@@ -64,52 +82,49 @@ class AudioAnalyzer(Thread):
         number = AudioAnalyzer.frequency_to_number(frequency, a4_freq)
         return AudioAnalyzer.number_to_note_name(number)
 
+    def set_strum_tuning(self, tuning, a4_freq=440.0):
+        """ 스트럼 튜닝 모드 전환 (피치 엔진에 위임) """
+        self.pitch_engine.set_strum_tuning(tuning, a4_freq)
+
+    def on_audio(self, indata, status):
+        """ PortAudio 콜백 스레드: (프레임 × 채널) 블록을 복사해 링에 넣고 깨우기만 함 """
+        if status.input_overflow:
+            INPUT_OVERFLOWS.inc()
+        if len(self.blocks) == self.blocks.maxlen:
+            RING_DROPS.inc()
+        self.blocks.append(indata.copy())
+        self.block_ready.set()
+
+    def process_block(self, data):
+        """ (프레임 × 채널) float32 블록으로 버퍼 갱신 → (채널별 주파수 목록, 줄별 결과 또는 None)
+
+        실시간 스레드 밖에서 녹음을 최대 속도로 재생할 때도 이 메서드를 직접 부른다.
+        """
+        return self.analyze_block(self.pitch_engine, data)
+
     def run(self):
         """ 마이크 입력을 처리하고 FFT를 통해 가장 큰 주파수를 감지 """
         self.running = True
+        try:
+            self.source.subscribe(self.on_audio)
+        except Exception as e:
+            sys.stderr.write(f'Error: Line {sys.exc_info()[-1].tb_lineno} {type(e).__name__} {e}\n')
+            return
 
-        while self.running:
-            try:
-                # 마이크 데이터 읽기
-                data = self.stream.read(self.CHUNK_SIZE, exception_on_overflow=False)
-                data = np.frombuffer(data, dtype=np.int16)
-
-                # 기존 버퍼에서 데이터를 이동 후 새로운 데이터 추가
-                self.buffer[:-self.CHUNK_SIZE] = self.buffer[self.CHUNK_SIZE:]
-                self.buffer[-self.CHUNK_SIZE:] = data
-
-                # FFT 수행 (제로 패딩 + 해닝 윈도우 적용)
-                magnitude_data = abs(np.fft.fft(np.pad(
-                    self.buffer * self.hanning_window,
-                    (0, len(self.buffer) * self.ZERO_PADDING),
-                    "constant"
-                )))
-
-                # FFT 결과에서 절반만 사용
-                magnitude_data = magnitude_data[:int(len(magnitude_data) / 2)]
-
-                # HPS (Harmonic Product Spectrum) 적용
-                magnitude_data_orig = copy.deepcopy(magnitude_data)
-                for i in range(2, self.NUM_HPS + 1):
-                    hps_len = int(np.ceil(len(magnitude_data) / i))
-                    magnitude_data[:hps_len] *= magnitude_data_orig[::i]
-
-                # 주파수 배열 생성
-                frequencies = np.fft.fftfreq(int((len(magnitude_data) * 2) / 1), 1. / self.SAMPLING_RATE)
-
-                # 60Hz 이하 주파수 제거
-                for i, freq in enumerate(frequencies):
-                    if freq > 60:
-                        magnitude_data[:i - 1] = 0
-                        break
-
-                # 가장 강한 주파수를 큐에 추가
-                self.queue.put(round(frequencies[np.argmax(magnitude_data)], 2))
-
-            except Exception as e:
-                sys.stderr.write(f'Error: Line {sys.exc_info()[-1].tb_lineno} {type(e).__name__} {e}\n')
-
-        # 마이크 스트림 정리
-        self.stream.stop_stream()
-        self.stream.close()
-        self.audio_object.terminate()
\ No newline at end of file
+        try:
+            while self.running:
+                if not self.block_ready.wait(timeout=self.WAIT_TIMEOUT):
+                    continue
+                self.block_ready.clear()
+                while self.blocks and self.running:
+                    try:
+                        # 채널별 가장 강한 주파수 목록(스트럼 튜닝 중이면 줄별 결과도)을 큐에 추가
+                        dropped = self.queue.put(self.process_block(self.blocks.popleft()))
+                        if dropped:
+                            QUEUE_DROPS.inc(dropped)
+
+                    except Exception as e:
+                        sys.stderr.write(f'Error: Line {sys.exc_info()[-1].tb_lineno} {type(e).__name__} {e}\n')
+        finally:
+            # 스트림은 장치 관리자가 공유하므로 구독만 해제
+            self.source.unsubscribe(self.on_audio)
@@ -0,0 +1,327 @@
+import numpy as np
+from monitoring import metrics
+from tuner_audio.strum_tune import StrumTuner
+from audio_io.numpy_compat import RFFT_SUPPORTS_OUT
+
+# 단계별 처리 시간 (DSP_METRICS=1 일 때만 수집)
+FFT_TIME = metrics.stage_histogram("tuner", "fft")
+HPS_TIME = metrics.stage_histogram("tuner", "hps")
+PEAK_TIME = metrics.stage_histogram("tuner", "peak_picking")
+STRUM_TIME = metrics.stage_histogram("tuner", "strum_peaks")
+
+YIN_TIME = metrics.stage_histogram("tuner", "yin")
+ZOOM_TIME = metrics.stage_histogram("tuner", "zoom_refine")
+
+class RingBuffer:
+    """ 쓰기 위치만 옮기는 원형 샘플 버퍼 (write_index 위치가 가장 오래된 샘플)
+
+    내부 배열은 (채널 수 × 길이) 모양이며, 모노는 채널 1개로 다룬다.
+    """
+
+    def __init__(self, size, channels=1):
+        self.data = np.zeros((channels, size))
+        self.write_index = 0
+
+    def __len__(self):
+        return self.data.shape[1]
+
+    def push(self, samples):
+        """ 쓰기 위치에 새 데이터를 덮어쓰고 위치만 이동 (버퍼 전체를 옮기지 않음)
+
+        samples는 모노 1차원 배열 또는 인터리브된 (프레임 × 채널) 배열. 채널 분리는 전치 뷰로만 한다.
+        """
+        samples = samples.reshape(1, -1) if samples.ndim == 1 else samples.T
+        size = len(self)
+        count = samples.shape[1]
+        if count >= size:
+            self.data[:] = samples[:, -size:]
+            self.write_index = 0
+            return
+        first = min(count, size - self.write_index)
+        self.data[:, self.write_index:self.write_index + first] = samples[:, :first]
+        self.data[:, :count - first] = samples[:, first:]
+        self.write_index = (self.write_index + count) % size
+
+    def copy_ordered(self, out, window=None):
+        """ 시간 순서대로 out[:, :size]에 복사 (window가 있으면 곱해서) """
+        size = len(self)
+        tail = size - self.write_index
+        if window is None:
+            out[:, :tail] = self.data[:, self.write_index:]
+            out[:, tail:size] = self.data[:, :self.write_index]
+        else:
+            np.multiply(self.data[:, self.write_index:], window[:tail], out=out[:, :tail])
+            np.multiply(self.data[:, :self.write_index], window[tail:], out=out[:, tail:size])
+        return out[:, :size]
+
+class PitchEngine:
+    """ 튜너 피치 엔진 공통 인터페이스
+
+    push(samples)로 새 청크를 넣고 estimate_channels()로 채널별 현재 주파수(Hz, 검출 실패 시 0)를 얻는다.
+    estimate()는 첫 채널(모노)의 주파수. warmup_chunks는 버퍼가 처음 찰 때까지 필요한 청크 수.
+    스트럼 튜닝을 지원하는 엔진은 set_strum_tuning() 후 estimate 때마다 string_readings(채널별 줄 목록)를 갱신한다.
+    """
+
+    warmup_chunks = 1
+    channels = 1
+    supports_strum = False
+    string_readings = None
+
+    def set_strum_tuning(self, tuning, a4_freq=440.0):
+        raise ValueError(f"{type(self).__name__}는 스트럼 튜닝을 지원하지 않음")
+
+    def push(self, samples):
+        raise NotImplementedError
+
+    def estimate_channels(self):
+        raise NotImplementedError
+
+    def estimate(self):
+        return self.estimate_channels()[0]
+
+class HpsPitchEngine(PitchEngine):
+    """ 제로 패딩 FFT + HPS(Harmonic Product Spectrum)로 가장 강한 음의 주파수를 찾음
+
+    하드웨어 없이도 쓸 수 있도록 AudioAnalyzer의 신호 처리 부분만 분리한 것.
+    push()로 새 샘플 청크를 넣고 estimate()로 현재 버퍼의 주파수를 얻는다.
+    버퍼는 쓰기 위치만 옮기는 원형 버퍼이고, FFT 작업 공간/주파수 표/차단 빈은 생성 시 한 번만 만든다.
+    """
+
+    supports_strum = True
+
+    def __init__(self, sampling_rate=48000, chunk_size=1024, buffer_times=50, zero_padding=3, num_hps=3, min_freq=60,
+                 channels=1):
+        self.sampling_rate = sampling_rate
+        self.channels = channels
+        self.chunk_size = chunk_size
+        self.zero_padding = zero_padding
+        self.num_hps = num_hps
+        self.min_freq = min_freq
+
+        self.buffer = RingBuffer(chunk_size * buffer_times, channels)
+        self.warmup_chunks = buffer_times
+        self.hanning_window = np.hanning(len(self.buffer))
+
+        # 채널별 제로 패딩 실수 FFT 작업 공간 (뒤쪽 패딩 구간은 항상 0으로 유지, 채널은 한 번에 변환)
+        fft_size = len(self.buffer) * (zero_padding + 1)
+        self.workspace = np.zeros((channels, fft_size))
+        self.spectrum = np.empty((channels, fft_size // 2 + 1), dtype=np.complex128)
+        self.magnitude = np.empty((channels, fft_size // 2))
+        self.magnitude_orig = np.empty((channels, fft_size // 2))
+        self.hps_lengths = [(i, int(np.ceil(fft_size // 2 / i))) for i in range(2, num_hps + 1)]
+
+        # 주파수 표와 min_freq 차단 빈
+        self.frequencies = np.fft.rfftfreq(fft_size, 1. / sampling_rate)[:fft_size // 2]
+        above = np.flatnonzero(self.frequencies > min_freq)
+        self.cutoff_index = max(int(above[0]) - 1, 0) if len(above) else 0
+        self.strum_tuner = None
+
+    def set_strum_tuning(self, tuning, a4_freq=440.0):
+        """ 스트럼 튜닝 모드 설정 (None이면 해제). 같은 FFT 크기 스펙트럼에서 줄별 피크를 함께 찾는다. """
+        self.strum_tuner = StrumTuner(self.frequencies, tuning, a4_freq) if tuning else None
+        self.string_readings = None
+
+    def push(self, samples):
+        self.buffer.push(samples)
+
+    def estimate_channels(self):
+        """ 채널별로 현재 버퍼에서 가장 강한 주파수(Hz) """
+        # 원형 버퍼를 시간 순서대로 창 함수와 곱해 작업 공간에 바로 기록 후 실수 FFT
+        start = metrics.now()
+        self.buffer.copy_ordered(self.workspace, self.hanning_window)
+        if RFFT_SUPPORTS_OUT:
+            np.fft.rfft(self.workspace, axis=-1, out=self.spectrum)
+            spectrum = self.spectrum
+        else:
+            spectrum = np.fft.rfft(self.workspace, axis=-1)
+        np.abs(spectrum[:, :self.magnitude.shape[1]], out=self.magnitude)
+        FFT_TIME.observe_since(start)
+
+        # 스트럼 튜닝: HPS 전 스펙트럼에서 줄별 탐색 빈만 확인 (분석 중 모드가 바뀌어도 한 번 읽은 값 사용)
+        strum_tuner = self.strum_tuner
+        if strum_tuner is not None:
+            start = metrics.now()
+            self.string_readings = [strum_tuner.measure(magnitude) for magnitude in self.magnitude]
+            STRUM_TIME.observe_since(start)
+
+        # HPS (Harmonic Product Spectrum) 적용
+        start = metrics.now()
+        np.copyto(self.magnitude_orig, self.magnitude)
+        for i, hps_len in self.hps_lengths:
+            self.magnitude[:, :hps_len] *= self.magnitude_orig[:, ::i]
+        HPS_TIME.observe_since(start)
+
+        # min_freq 이하 주파수 제거 후 가장 강한 주파수
+        start = metrics.now()
+        self.magnitude[:, :self.cutoff_index] = 0
+        peak_bins = np.argmax(self.magnitude, axis=-1)
+        PEAK_TIME.observe_since(start)
+        return self.refine(peak_bins)
+
+    def refine(self, peak_bins):
+        """ 채널별 HPS 피크 빈 → 주파수(Hz) """
+        return [round(freq, 2) for freq in self.frequencies[peak_bins]]
+
+class ZoomPitchEngine(HpsPitchEngine):
+    """ 짧은 창의 거친 FFT + HPS로 기본음 근처를 찾고, 그 주변만 chirp-z 변환으로 확대해 정밀 추정
+
+    HPS 엔진처럼 51,200 샘플을 4배 제로 패딩해 0~24kHz 전체를 촘촘히 계산하는 대신,
+    8,192 샘플 창의 작은 FFT로 후보 빈을 고른 뒤 ±zoom_bins 빈 구간을 zoom_points개 점으로 다시 계산하고
+    로그 크기 포물선 보간으로 점 사이 값을 추정한다. chirp-z는 Bluestein 방식(FFT 합성곱)으로 계산하며,
+    구간 폭이 고정이라 처프와 합성곱 커널의 FFT는 생성 시 한 번만 만든다.
+    """
+
+    def __init__(self, sampling_rate=48000, chunk_size=1024, window_size=8192, zero_padding=1, num_hps=3, min_freq=60,
+                 zoom_bins=1.5, zoom_points=64, min_partial_level=0.05, channels=1):
+        super().__init__(sampling_rate, chunk_size, buffer_times=max(window_size // chunk_size, 1),
+                         zero_padding=zero_padding, num_hps=num_hps, min_freq=min_freq, channels=channels)
+        size = len(self.buffer)
+        self.min_partial_level = min_partial_level
+        self.zoom_span = zoom_bins * (self.frequencies[1] - self.frequencies[0])
+        self.zoom_points = zoom_points
+        self.zoom_step = 2 * self.zoom_span / (zoom_points - 1)
+
+        # Bluestein chirp-z: X_k = sum_n x_n e^{-2πi(f_lo + k·df)n/fs}
+        #   = w_k Σ_n (x_n e^{-2πi f_lo n/fs} w_n) v_{k-n},  w_n = e^{-iπ df n²/fs},  v_m = e^{iπ df m²/fs}
+        self.sample_index = np.arange(size)
+        self.chirp = np.exp(-1j * np.pi * self.zoom_step * self.sample_index ** 2 / sampling_rate)
+        self.czt_size = 1 << int(np.ceil(np.log2(size + zoom_points - 1)))
+        kernel = np.zeros(self.czt_size, dtype=np.complex128)
+        lags = np.arange(zoom_points)
+        kernel[:zoom_points] = np.exp(1j * np.pi * self.zoom_step * lags ** 2 / sampling_rate)
+        lags = np.arange(1, size)
+        kernel[-(size - 1):] = np.exp(1j * np.pi * self.zoom_step * lags[::-1] ** 2 / sampling_rate)
+        self.kernel_spectrum = np.fft.fft(kernel)
+
+    def refine(self, peak_bins):
+        """ 거친 피크 빈 주변을 chirp-z로 확대한 뒤 포물선 보간 (|w_k| = 1이므로 크기만 볼 때는 생략) """
+        start = metrics.now()
+        size = len(self.buffer)
+
+        # 짧은 창에서는 배음이 적은 소리에 HPS가 실제로 없는 하위 음을 고를 수 있으므로,
+        # 원래 스펙트럼에서 가장 큰 성분 대비 min_partial_level보다 약한 빈이면 원래 스펙트럼의 최댓값으로 대체
+        raw = self.magnitude_orig[:, self.cutoff_index:]
+        raw_peaks = self.cutoff_index + np.argmax(raw, axis=-1)
+        rows = np.arange(len(peak_bins))
+        weak = self.magnitude_orig[rows, peak_bins] < self.min_partial_level * self.magnitude_orig[rows, raw_peaks]
+        peak_bins = np.where(weak, raw_peaks, peak_bins)
+        low = self.frequencies[peak_bins] - self.zoom_span  # 채널별 확대 구간 시작 주파수
+        # 작업 공간 앞부분에는 창 함수를 곱한 현재 프레임이 그대로 남아 있음
+        shift = np.exp(-2j * np.pi * np.outer(low, self.sample_index) / self.sampling_rate)
+        chirped = self.workspace[:, :size] * shift * self.chirp
+        zoomed = np.fft.ifft(np.fft.fft(chirped, self.czt_size, axis=-1) * self.kernel_spectrum, axis=-1)
+        magnitude = np.abs(zoomed[:, :self.zoom_points])
+
+        peaks = np.argmax(magnitude, axis=-1)
+        freqs = []
+        for channel, peak in enumerate(peaks):
+            offset = 0.0
+            if 0 < peak < self.zoom_points - 1:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    left, center, right = np.log(magnitude[channel, peak - 1:peak + 2] + 1e-12)
+                denominator = left - 2 * center + right
+                offset = 0.5 * (left - right) / denominator if denominator < 0 else 0.0
+            freq = low[channel] + (peak + offset) * self.zoom_step
+            freqs.append(round(freq, 2) if peak_bins[channel] > self.cutoff_index else 0.0)  # 무음
+        ZOOM_TIME.observe_since(start)
+        return freqs
+
+class YinPitchEngine(PitchEngine):
+    """ YIN 알고리즘(시간 영역)으로 기본 주파수를 찾음
+
+    누적 평균 정규화 차분 함수(CMNDF)를 FFT 기반 자기상관으로 한 번에 계산하므로,
+    HPS처럼 1초 가까운 버퍼 없이 수십 ms 창으로도 센트 단위 정확도를 낸다.
+    """
+
+    def __init__(self, sampling_rate=48000, chunk_size=1024, window_size=2048, min_freq=60, max_freq=1200,
+                 threshold=0.15, silence_rms=1e-3, channels=1):
+        self.sampling_rate = sampling_rate
+        self.channels = channels
+        self.chunk_size = chunk_size
+        self.window_size = window_size
+        self.threshold = threshold
+        self.tau_min = max(2, int(sampling_rate / max_freq))
+        self.tau_max = int(np.ceil(sampling_rate / min_freq))
+        # 무음 판정 기준 (int16 입력 기준 RMS → 진폭 스케일에 맞춰 비교)
+        self.silence_rms = silence_rms
+
+        # 창(window_size)과 최대 지연(tau_max)을 모두 담는 버퍼
+        size = window_size + self.tau_max + 1
+        self.buffer = RingBuffer(size, channels)
+        self.warmup_chunks = int(np.ceil(size / chunk_size))
+        self.frame = np.empty((channels, size))
+
+        # 상호상관용 FFT 크기 (원형 상관이 겹치지 않도록 2의 거듭제곱으로)
+        self.fft_size = 1 << int(np.ceil(np.log2(size + window_size)))
+        self.taus = np.arange(self.tau_max + 1)
+
+    def push(self, samples):
+        self.buffer.push(samples)
+
+    def difference(self, x):
+        """ 채널별 d(tau) = sum_j (x_j - x_{j+tau})^2, tau = 0..tau_max """
+        w = self.window_size
+        head = x[:, :w]
+        spectrum = np.conj(np.fft.rfft(head, self.fft_size, axis=-1)) * np.fft.rfft(x, self.fft_size, axis=-1)
+        acf = np.fft.irfft(spectrum, self.fft_size, axis=-1)[:, :self.tau_max + 1]
+
+        squares = np.zeros((x.shape[0], x.shape[1] + 1))
+        np.cumsum(x * x, axis=-1, out=squares[:, 1:])
+        energy_head = squares[:, w:w + 1]
+        energy_shifted = squares[:, self.taus + w] - squares[:, self.taus]
+        return energy_head + energy_shifted - 2 * acf
+
+    def estimate_channels(self):
+        start = metrics.now()
+        x = self.buffer.copy_ordered(self.frame)
+        silent = np.sqrt(np.mean(x * x, axis=-1)) < self.silence_rms
+        if silent.all():
+            YIN_TIME.observe_since(start)
+            return [0.0] * self.channels
+
+        diff = self.difference(x)
+        diff[:, 0] = 0.0
+        # 누적 평균 정규화 (d'(0) = 1)
+        cumulative = np.cumsum(diff[:, 1:], axis=-1)
+        cmndf = np.ones_like(diff)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cmndf[:, 1:] = diff[:, 1:] * self.taus[1:] / cumulative
+        cmndf[~np.isfinite(cmndf)] = 1.0
+
+        freqs = [0.0 if is_silent else self.pick_frequency(channel_cmndf)
+                 for channel_cmndf, is_silent in zip(cmndf, silent)]
+        YIN_TIME.observe_since(start)
+        return freqs
+
+    def pick_frequency(self, cmndf):
+        # 임계값 아래로 처음 내려간 지점부터 극소점까지 진행, 없으면 전체 최솟값
+        search = cmndf[self.tau_min:self.tau_max]
+        below = np.flatnonzero(search < self.threshold)
+        if len(below):
+            tau = self.tau_min + below[0]
+            while tau + 1 < self.tau_max and cmndf[tau + 1] < cmndf[tau]:
+                tau += 1
+        else:
+            tau = self.tau_min + int(np.argmin(search))
+
+        # 포물선 보간으로 소수 지연 추정
+        if 0 < tau < self.tau_max:
+            left, center, right = cmndf[tau - 1], cmndf[tau], cmndf[tau + 1]
+            denominator = left - 2 * center + right
+            shift = 0.5 * (left - right) / denominator if denominator != 0 else 0.0
+        else:
+            shift = 0.0
+        return round(self.sampling_rate / (tau + shift), 2)
+
+# 설정 이름 → 엔진 클래스
+PITCH_ENGINES = {
+    "hps": HpsPitchEngine,
+    "yin": YinPitchEngine,
+    "zoom": ZoomPitchEngine,
+}
+
+def make_pitch_engine(name="hps", sampling_rate=48000, chunk_size=1024, **options):
+    """ 이름으로 피치 엔진 생성 (Tuner/AudioAnalyzer 설정용) """
+    if name not in PITCH_ENGINES:
+        raise ValueError(f"알 수 없는 피치 엔진: {name} (사용 가능: {', '.join(PITCH_ENGINES)})")
+    return PITCH_ENGINES[name](sampling_rate, chunk_size, **options)
@@ -0,0 +1,133 @@
+import sys
+import queue as queue_module
+import multiprocessing as mp
+from threading import Thread
+from audio_io.device_manager import device_manager
+from audio_io.shared_capture import SharedRing, RingReader, capture_main
+from audio_io.sources import open_source
+from tuner_audio.audio_analyzer import AudioAnalyzer
+from monitoring import metrics
+
+QUEUE_DROPS = metrics.dropped_frames("tuner", "queue_full")
+RING_DROPS = metrics.dropped_frames("tuner", "shared_ring_overrun")
+RESULT_DROPS = metrics.dropped_frames("tuner", "result_queue_full")
+INPUT_OVERFLOWS = metrics.input_overflows("tuner")
+
+def pitch_worker_main(ring_name, pitch_engine, results, control, stop_event):
+    """ DSP 프로세스 진입점: 공유 링의 블록 뷰를 바로 피치 엔진에 넣고, 작은 결과 메시지만 돌려보낸다
+
+    결과는 (채널별 주파수, 줄별 결과 또는 None, 링에서 건너뛴 블록 수, 결과 큐가 차서 버린 수).
+    control 큐로는 스트럼 튜닝 전환 (tuning, a4_freq)을 받는다.
+    """
+    ring = SharedRing.attach(ring_name)
+    reader = RingReader(ring)
+    engine = AudioAnalyzer.create_pitch_engine(pitch_engine, ring.samplerate, ring.blocksize, ring.channels)
+    reported_drops = 0
+    result_drops = 0
+    block = None
+    try:
+        while not stop_event.is_set():
+            while True:
+                try:
+                    engine.set_strum_tuning(*control.get_nowait())
+                except queue_module.Empty:
+                    break
+                except ValueError as e:
+                    sys.stderr.write(f'Error: {e}\n')
+
+            block = reader.read(timeout=0.2)
+            if block is None:
+                continue
+            freqs, strings = AudioAnalyzer.analyze_block(engine, block)
+            freqs = [float(freq) for freq in freqs]
+            try:
+                results.put_nowait((freqs, strings, reader.dropped - reported_drops, result_drops))
+                reported_drops = reader.dropped
+                result_drops = 0
+            except queue_module.Full:
+                result_drops += 1
+    finally:
+        # 공유 메모리 뷰를 모두 놓은 뒤 닫음
+        block = reader = None
+        ring.close()
+
+class ProcessAnalyzer(Thread):
+    """ 캡처와 피치 분석을 각각 별도 프로세스에서 돌리는 AudioAnalyzer 대체
+
+    캡처 프로세스가 공유 메모리 링(audio_io.shared_capture)에 블록을 쓰고, 분석 프로세스가 그 링을 복사 없이 읽는다.
+    웹 서버 프로세스의 이 스레드는 작은 결과 메시지만 받아 queue에 넣으므로, API 요청이 몰려 GIL이 바빠도 캡처가 끊기지 않는다.
+    """
+
+    CAPACITY_BLOCKS = 64  # 공유 링 크기 (블록 수, 48kHz/1024 기준 약 1.4초)
+    RESULT_QUEUE_SIZE = 8
+    JOIN_TIMEOUT = 2.0
+
+    def __init__(self, queue, input_device=None, pitch_engine="hps", channels=None, source_spec="live"):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.running = False
+
+        # 링 크기를 정하려면 채널 수를 미리 알아야 함 (live는 장치 입력 채널 전부, 그 외는 소스에서 확인)
+        if channels is None:
+            if source_spec == "live":
+                channels = device_manager.max_input_channels(input_device)
+            else:
+                channels = open_source(source_spec, AudioAnalyzer.SAMPLING_RATE, AudioAnalyzer.CHUNK_SIZE).channels
+        self.channels = channels
+        self.input_device = input_device
+        self.pitch_engine = pitch_engine
+        self.source_spec = source_spec
+
+        # PortAudio/스레드 상태를 물려받지 않도록 spawn으로 시작
+        self.context = mp.get_context("spawn")
+        self.stop_event = self.context.Event()
+        self.results = self.context.Queue(self.RESULT_QUEUE_SIZE)
+        self.control = self.context.Queue()
+
+    def set_strum_tuning(self, tuning, a4_freq=440.0):
+        """ 분석 프로세스에 스트럼 튜닝 전환 전달 """
+        self.control.put((tuning, a4_freq))
+
+    def run(self):
+        self.running = True
+        # 공유 링은 실제로 시작할 때 만들어 run()이 끝날 때 지움 (시작 전에 정지된 analyzer는 공유 메모리를 남기지 않음)
+        ring = SharedRing.create(AudioAnalyzer.SAMPLING_RATE, self.channels, AudioAnalyzer.CHUNK_SIZE, self.CAPACITY_BLOCKS)
+        processes = [
+            self.context.Process(target=capture_main, args=(ring.name, self.source_spec, self.input_device, self.stop_event),
+                                 daemon=True),
+            self.context.Process(target=pitch_worker_main,
+                                 args=(ring.name, self.pitch_engine, self.results, self.control, self.stop_event),
+                                 daemon=True),
+        ]
+
+        overflows = 0
+        try:
+            for process in processes:
+                process.start()
+            while self.running:
+                try:
+                    freqs, strings, ring_drops, result_drops = self.results.get(timeout=0.2)
+                except queue_module.Empty:
+                    continue
+                if ring_drops:
+                    RING_DROPS.inc(ring_drops)
+                if result_drops:
+                    RESULT_DROPS.inc(result_drops)
+                if ring.overflows != overflows:
+                    INPUT_OVERFLOWS.inc(ring.overflows - overflows)
+                    overflows = ring.overflows
+
+                dropped = self.queue.put((freqs, strings))
+                if dropped:
+                    QUEUE_DROPS.inc(dropped)
+        finally:
+            self.stop_event.set()
+            for process in processes:
+                if process.pid is None:
+                    continue  # 시작하지 못한 프로세스
+                process.join(self.JOIN_TIMEOUT)
+                if process.is_alive():
+                    process.terminate()
+            self.results.close()
+            self.control.close()
+            ring.close()
@@ -0,0 +1,75 @@
+import numpy as np
+
+# 튜닝별 개방현 (6번줄 → 1번줄), (음이름, MIDI 번호)
+TUNINGS = {
+    "standard": [("E2", 40), ("A2", 45), ("D3", 50), ("G3", 55), ("B3", 59), ("E4", 64)],
+    "drop_d": [("D2", 38), ("A2", 45), ("D3", 50), ("G3", 55), ("B3", 59), ("E4", 64)],
+    "dadgad": [("D2", 38), ("A2", 45), ("D3", 50), ("G3", 55), ("A3", 57), ("D4", 62)],
+    "open_g": [("D2", 38), ("G2", 43), ("D3", 50), ("G3", 55), ("B3", 59), ("D4", 62)],
+    "half_step_down": [("D#2", 39), ("G#2", 44), ("C#3", 49), ("F#3", 54), ("A#3", 58), ("D#4", 63)],
+}
+
+class StrumTuner:
+    """ 개방현을 한 번에 친 소리에서 줄마다 목표 주파수 근처의 피크를 찾아 센트 오차를 계산
+
+    스펙트럼 주파수 표(frequencies)에 맞춰 줄별 탐색 빈 범위를 생성 시 한 번만 만들어 두고,
+    measure()는 그 빈들만 한 번에 인덱싱해 피크를 고른 뒤 로그 크기의 포물선 보간으로 빈 사이 값을 추정한다.
+    """
+
+    SEARCH_CENTS = 80  # 목표 음 기준 탐색 범위 (±센트, 반음 간격 줄끼리 겹치지 않도록 100 미만)
+    MIN_LEVEL = 0.02  # 가장 큰 줄 피크 대비 이보다 약하면 울리지 않은 줄로 봄
+
+    def __init__(self, frequencies, tuning="standard", a4_freq=440.0, search_cents=SEARCH_CENTS, min_level=MIN_LEVEL):
+        if tuning not in TUNINGS:
+            raise ValueError(f"알 수 없는 튜닝: {tuning} (사용 가능: {', '.join(TUNINGS)})")
+        self.tuning = tuning
+        self.min_level = min_level
+        self.names = [name for name, _ in TUNINGS[tuning]]
+        self.targets = np.array([a4_freq * 2.0 ** ((midi - 69) / 12.0) for _, midi in TUNINGS[tuning]])
+
+        # 줄별 탐색 빈 범위 [low, high) → 가장 넓은 범위에 맞춘 (줄 × 폭) 인덱스 표와 유효 마스크
+        self.frequencies = frequencies
+        self.bin_width = frequencies[1] - frequencies[0]
+        ratio = 2.0 ** (search_cents / 1200)
+        low = np.searchsorted(frequencies, self.targets / ratio)
+        high = np.maximum(np.searchsorted(frequencies, self.targets * ratio), low + 1)
+        offsets = np.arange(int((high - low).max()))
+        self.indices = np.minimum(low[:, None] + offsets, high[:, None] - 1)
+        self.valid = offsets < (high - low)[:, None]
+        self.low = low
+        self.high = high
+
+    def measure(self, magnitude):
+        """ 한 채널의 크기 스펙트럼 → 줄별 {"string", "name", "target", "frequency", "cents"} 목록
+
+        피크가 너무 약하거나 탐색 범위 가장자리에 걸리면(옆 음의 기울기) frequency/cents는 None.
+        """
+        window = np.where(self.valid, magnitude[self.indices], -np.inf)
+        peaks = np.argmax(window, axis=1)
+        rows = np.arange(len(peaks))
+        levels = window[rows, peaks]
+        bins = self.indices[rows, peaks]
+
+        # 로그 크기 포물선 보간 (이웃 빈이 있을 때만)
+        inner = (bins > 0) & (bins < len(magnitude) - 1)
+        neighbors = np.clip(np.stack([bins - 1, bins, bins + 1]), 0, len(magnitude) - 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            left, center, right = np.log(magnitude[neighbors] + 1e-12)
+            denominator = left - 2 * center + right
+            shift = np.where(inner & (denominator < 0), 0.5 * (left - right) / denominator, 0.0)
+            freqs = self.frequencies[bins] + shift * self.bin_width
+            cents = 1200 * np.log2(freqs / self.targets)
+
+        loudest = levels.max()
+        heard = (levels > 0) & (levels >= loudest * self.min_level) & (bins > self.low) & (bins < self.high - 1)
+
+        readings = []
+        for i, name in enumerate(self.names):
+            readings.append({
+                "string": len(self.names) - i,
+                "name": name,
+                "target": round(float(self.targets[i]), 2),
+                "frequency": round(float(freqs[i]), 2) if heard[i] else None,
+                "cents": round(float(cents[i]), 1) if heard[i] else None,
+            })
+        return readings
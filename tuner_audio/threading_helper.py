@@ -1,27 +1,55 @@
-from threading import Lock
+from threading import Condition
 
 
-class ProtectedList:
-    """ Simple queue to share data between Threads with lock protection.
-        Standard buffer length is only 8! """
+class SampleQueue:
+    """ Fixed-capacity ring queue to share data between Threads.
+        When full, put() drops the oldest element; get() blocks until an element arrives. """
 
     def __init__(self, buffer_size=8):
-        self.elements = []
+        self.elements = [None] * buffer_size
         self.buffer_size = buffer_size
-        self.lock = Lock()
+        self.head = 0  # index of the oldest element
+        self.count = 0
+        self.dropped = 0  # total elements dropped by overflow
+        self.condition = Condition()
 
     def put(self, element):
-        with self.lock:
-            self.elements.append(element)
-            if len(self.elements) > self.buffer_size:
-                self.elements.pop(0)
+        """ Returns how many elements were dropped to make room (0 or 1). """
+        with self.condition:
+            dropped = 0
+            if self.count == self.buffer_size:
+                self.head = (self.head + 1) % self.buffer_size
+                self.count -= 1
+                dropped = 1
+                self.dropped += 1
+            self.elements[(self.head + self.count) % self.buffer_size] = element
+            self.count += 1
+            self.condition.notify()
+            return dropped
 
-    def get(self):
-        with self.lock:
-            if self.elements:
-                return self.elements.pop(0)
-            return None
+    def pop_oldest(self):
+        element = self.elements[self.head]
+        self.elements[self.head] = None
+        self.head = (self.head + 1) % self.buffer_size
+        self.count -= 1
+        return element
+
+    def get(self, timeout=None):
+        """ Wait up to timeout seconds (forever if None); returns None on timeout. """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.count > 0, timeout):
+                return None
+            return self.pop_oldest()
+
+    def drain(self):
+        """ Remove and return every queued element, oldest first, without blocking. """
+        with self.condition:
+            return [self.pop_oldest() for _ in range(self.count)]
+
+    def __len__(self):
+        with self.condition:
+            return self.count
 
     def __repr__(self):
-        with self.lock:
-            return str(self.elements)
+        with self.condition:
+            return str([self.elements[(self.head + i) % self.buffer_size] for i in range(self.count)])